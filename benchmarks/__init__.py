@@ -0,0 +1 @@
+"""Stand-alone performance benchmarks, run from the project directory with e.g. `python -m benchmarks.loader`."""
@@ -0,0 +1,58 @@
+"""Request throughput of the catalogue and description pages in database mode, per SQLite profile.
+
+Also reports committed writes per second (registering users), where synchronous=NORMAL under WAL matters most.
+Each profile gets a freshly populated database in a temporary directory.
+Run from the project directory: `python -m benchmarks.db_throughput`.
+"""
+import os
+import tempfile
+import time
+
+import config  # noqa: F401  imported before changing directory so create_app can still find it
+import podcast.adapters.repository as repo
+from podcast import create_app
+from podcast.domainmodel.model import User
+
+DATA_PATH = os.path.abspath('podcast/adapters/')
+PROFILES = ['default', 'performance']
+REQUESTS = 20
+WRITES = 200
+
+
+def measure(client, urls) -> float:
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        response = client.get(urls[i % len(urls)])
+        assert response.status_code == 200
+    return REQUESTS / (time.perf_counter() - start)
+
+
+def measure_writes() -> float:
+    start = time.perf_counter()
+    for i in range(WRITES):
+        repo.repo_instance.add_user(User(i + 1, f'benchmark_user_{i}', 'password'))
+    return WRITES / (time.perf_counter() - start)
+
+
+def main():
+    project_directory = os.getcwd()
+    catalogue_urls = [f'/podcasts?page={page}' for page in range(1, 80)]
+    description_urls = [f'/description/{podcast_id}' for podcast_id in range(1, 1000, 7)]
+    print(f"{'profile':>12} {'catalogue req/s':>16} {'description req/s':>18} {'writes/s':>10}")
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                app = create_app({'TESTING': True, 'REPOSITORY': 'database', 'TEST_DATA_PATH': DATA_PATH,
+                                  'DATABASE_PROFILE': profile})
+                client = app.test_client()
+                catalogue = measure(client, catalogue_urls)
+                description = measure(client, description_urls)
+                writes = measure_writes()
+            finally:
+                os.chdir(project_directory)
+        print(f'{profile:>12} {catalogue:>16.1f} {description:>18.1f} {writes:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Latency of the podcast lookup behind /description/<id> as the catalogue grows.
+
+Podcast ids are spaced out so the catalogue is sparse, like the real feed. The old lookup, which converts the whole
+catalogue to dicts on every hit, is timed alongside for comparison.
+
+Run from the project directory: `python -m benchmarks.description_latency`.
+"""
+import random
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from podcast.adapters.database_repository import SqlAlchemyRepository
+from podcast.adapters.memory_repository import MemoryRepository
+from podcast.adapters.orm import mapper_registry, map_model_to_tables
+from podcast.description.services import get_podcast_by_id, podcast_to_dict
+from podcast.domainmodel.model import Author, Category, Podcast
+
+SIZES = [1_000, 10_000, 50_000]
+LOOKUPS = 200
+ID_STEP = 3
+
+
+def make_catalogue(number_of_podcasts: int):
+    authors = [Author(i, f'Author {i}') for i in range(1, number_of_podcasts // 3 + 2)]
+    categories = [Category(i, f'Category {i}') for i in range(1, 301)]
+    podcasts = []
+    for i in range(number_of_podcasts):
+        podcast = Podcast(1 + i * ID_STEP, authors[i // 3], f'Podcast {i}')
+        podcast.add_category(categories[i % 300])
+        podcast.add_category(categories[(i * 7) % 300])
+        podcasts.append(podcast)
+    return authors, categories, podcasts
+
+
+def memory_repository(number_of_podcasts: int) -> MemoryRepository:
+    authors, categories, podcasts = make_catalogue(number_of_podcasts)
+    repo = MemoryRepository()
+    repo.set_podcasts(podcasts)
+    return repo
+
+
+def database_repository(number_of_podcasts: int) -> SqlAlchemyRepository:
+    clear_mappers()
+    engine = create_engine('sqlite://')
+    mapper_registry.metadata.create_all(engine)
+    map_model_to_tables()
+    authors, categories, podcasts = make_catalogue(number_of_podcasts)
+    repo = SqlAlchemyRepository(sessionmaker(autocommit=False, autoflush=True, bind=engine))
+    repo.add_multiple_authors(authors)
+    repo.add_multiple_categories(categories)
+    repo.add_multiple_podcasts(podcasts)
+    return repo
+
+
+def full_catalogue_lookup(podcast_id: int, repo):
+    # What the description page used to do: convert every podcast, then index by position
+    podcasts = [podcast_to_dict(podcast) for podcast in repo.get_podcasts_by_id()]
+    return podcasts[(podcast_id - 1) // ID_STEP]
+
+
+def time_lookups(repo, number_of_podcasts: int, lookup, lookups: int = LOOKUPS) -> float:
+    ids = [1 + random.randrange(number_of_podcasts) * ID_STEP for _ in range(lookups)]
+    start = time.perf_counter()
+    for podcast_id in ids:
+        if isinstance(repo, SqlAlchemyRepository):
+            # A fresh session per lookup, as for each web request, so nothing is served from the identity map
+            repo.reset_session()
+        lookup(podcast_id, repo)
+    return (time.perf_counter() - start) / lookups
+
+
+def main():
+    random.seed(0)
+    print(f'{"podcasts":>10} {"repository":>10} {"single fetch":>14} {"full catalogue":>16}')
+    for size in SIZES:
+        for name, factory in (('memory', memory_repository), ('database', database_repository)):
+            repo = factory(size)
+            single = time_lookups(repo, size, get_podcast_by_id)
+            full = time_lookups(repo, size, full_catalogue_lookup, lookups=1)
+            print(f'{size:>10} {name:>10} {single * 1e6:>11.1f} us {full * 1000:>13.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
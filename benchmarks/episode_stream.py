@@ -0,0 +1,66 @@
+"""Compares peak memory of CSVDataReader.read_episodes with streaming through CSVDataReader.iter_episodes.
+
+read_episodes keeps every episode, so its peak grows with the file; iter_episodes should stay flat.
+"""
+import csv
+import os
+import tempfile
+import time
+import tracemalloc
+
+from podcast.adapters.datareader.csvdatareader import CSVDataReader
+from benchmarks.loader import write_podcasts_csv
+
+EPISODE_FIELDS = ['id', 'podcast_id', 'title', 'audio', 'audio_length', 'description', 'pub_date']
+NUMBER_OF_PODCASTS = 1_000
+SIZES = [10_000, 50_000, 200_000]
+
+
+def write_episodes_csv(path: str, number_of_episodes: int):
+    with open(path, mode='w', newline='', encoding='utf-8') as episode_file:
+        writer = csv.DictWriter(episode_file, fieldnames=EPISODE_FIELDS)
+        writer.writeheader()
+        for i in range(1, number_of_episodes + 1):
+            writer.writerow({
+                'id': i,
+                'podcast_id': i % NUMBER_OF_PODCASTS + 1,
+                'title': f'Episode {i}',
+                'audio': f'http://example.com/{i}.mp3',
+                'audio_length': 1800,
+                'description': '<p>A synthetic episode used for benchmarking.</p>' * 4,
+                'pub_date': f'2017-12-{i % 28 + 1:02d} 10:00:00+00',
+            })
+
+
+def measure(episode_path: str, podcast_path: str, streaming: bool):
+    reader = CSVDataReader(episode_path, podcast_path)
+    reader.read_podcasts()
+    tracemalloc.start()
+    start = time.perf_counter()
+    if streaming:
+        count = sum(len(chunk) for chunk in reader.iter_episodes())
+    else:
+        reader.read_episodes()
+        count = len(reader.dataset_of_episodes)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        podcast_path = os.path.join(directory, 'podcasts.csv')
+        write_podcasts_csv(podcast_path, NUMBER_OF_PODCASTS)
+        print(f"{'episodes':>10} {'mode':>10} {'seconds':>10} {'peak MiB':>10}")
+        for size in SIZES:
+            episode_path = os.path.join(directory, f'episodes_{size}.csv')
+            write_episodes_csv(episode_path, size)
+            for streaming in (False, True):
+                count, elapsed, peak = measure(episode_path, podcast_path, streaming)
+                mode = 'stream' if streaming else 'read all'
+                print(f'{count:>10} {mode:>10} {elapsed:>10.2f} {peak / 2 ** 20:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
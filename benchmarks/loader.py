@@ -0,0 +1,53 @@
+"""Times CSVDataReader.read_podcasts against synthetic podcasts.csv files of increasing size.
+
+The time per row should stay roughly constant as the file grows, i.e. start-up time grows linearly.
+"""
+import csv
+import os
+import tempfile
+import time
+
+from podcast.adapters.datareader.csvdatareader import CSVDataReader
+
+PODCAST_FIELDS = ['id', 'title', 'image', 'description', 'language', 'categories', 'website', 'author', 'itunes_id']
+SIZES = [1_000, 10_000, 50_000, 100_000]
+
+
+def write_podcasts_csv(path: str, number_of_podcasts: int):
+    # Roughly one author per three podcasts and a few hundred categories, like the real feed.
+    with open(path, mode='w', newline='', encoding='utf-8') as podcast_file:
+        writer = csv.DictWriter(podcast_file, fieldnames=PODCAST_FIELDS)
+        writer.writeheader()
+        for i in range(1, number_of_podcasts + 1):
+            writer.writerow({
+                'id': i,
+                'title': f'Podcast {i}',
+                'image': f'http://example.com/{i}.jpg',
+                'description': 'A synthetic podcast used for benchmarking.',
+                'language': 'English',
+                'categories': f'Category {i % 300} | Category {(i * 7) % 300}',
+                'website': f'http://example.com/{i}',
+                'author': '' if i % 50 == 0 else f'Author {i // 3}',
+                'itunes_id': 100000 + i,
+            })
+
+
+def time_read_podcasts(podcast_path: str) -> float:
+    reader = CSVDataReader('', podcast_path)
+    start = time.perf_counter()
+    reader.read_podcasts()
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'podcasts':>10} {'seconds':>10} {'us/row':>10}")
+        for size in SIZES:
+            podcast_path = os.path.join(directory, f'podcasts_{size}.csv')
+            write_podcasts_csv(podcast_path, size)
+            elapsed = time_read_podcasts(podcast_path)
+            print(f'{size:>10} {elapsed:>10.3f} {elapsed / size * 1_000_000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Query latency of the in-memory podcast search index at 100k podcasts, against the old substring scan.
+
+Each query fetches the first page of results, as search_results does, in relevance order for the title field and
+for every field, and in title order for every field.
+
+Run from the project directory: `python -m benchmarks.search`.
+"""
+import random
+import time
+
+from podcast.adapters.search_index import PodcastSearchIndex
+from podcast.domainmodel.model import Author, Category, Podcast
+
+NUMBER_OF_PODCASTS = 100_000
+VOCABULARY_SIZE = 20_000
+QUERIES = ['radio', 'news daily', 'true crime', 'word123', 'word1234 radio', 'history war stories', 'wor', 'a']
+PAGE_SIZE = 8
+REPEATS = 200
+
+
+def make_podcasts(number_of_podcasts: int):
+    rng = random.Random(0)
+    common = ['radio', 'news', 'daily', 'comedy', 'true', 'crime', 'history', 'war', 'stories', 'show']
+    vocabulary = [f'word{i}' for i in range(VOCABULARY_SIZE)]
+
+    def random_word():
+        # One word in ten is one of a handful of common podcast words; the rest come from a large vocabulary
+        return rng.choice(common) if rng.random() < 0.1 else rng.choice(vocabulary)
+
+    categories = [Category(i, f'Category {i}') for i in range(300)]
+    podcasts = []
+    for i in range(1, number_of_podcasts + 1):
+        title = ' '.join(random_word() for _ in range(4))
+        description = ' '.join(random_word() for _ in range(30))
+        podcast = Podcast(i, Author(i // 3, f'Author {i // 3}'), title, description=f'<p>{description}</p>')
+        podcast.add_category(categories[i % 300])
+        podcasts.append(podcast)
+    return podcasts
+
+
+def substring_scan(podcasts, query: str):
+    # The case-insensitive substring match over every title that the index replaced
+    return [podcast for podcast in podcasts if query.lower() in podcast.title.lower()]
+
+
+def time_per_query(search, query: str, repeats: int) -> float:
+    # Up to `repeats` runs, stopping early once a second has been spent on the query
+    start = time.perf_counter()
+    runs = 0
+    while runs < repeats and (runs == 0 or time.perf_counter() - start < 1):
+        search(query)
+        runs += 1
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    podcasts = make_podcasts(NUMBER_OF_PODCASTS)
+    index = PodcastSearchIndex()
+    start = time.perf_counter()
+    index.add_all(podcasts)
+    index.search('warm up')  # sorts the vocabulary
+    print(f'indexed {NUMBER_OF_PODCASTS} podcasts in {time.perf_counter() - start:.2f} s')
+
+    print(f'{"query":>22} {"hits (title)":>13} {"hits (all)":>11} {"title":>10} {"all":>10} {"all by title":>13} '
+          f'{"title scan":>11}')
+    for query in QUERIES:
+        title_hits = index.search_page(query, limit=PAGE_SIZE, fields=['title'])[1]
+        all_hits = index.search_page(query, limit=PAGE_SIZE)[1]
+        title_time = time_per_query(lambda q: index.search_page(q, limit=PAGE_SIZE, fields=['title']), query, REPEATS)
+        all_time = time_per_query(lambda q: index.search_page(q, limit=PAGE_SIZE), query, REPEATS)
+        ordered_time = time_per_query(lambda q: index.search_page(q, limit=PAGE_SIZE, order='title'), query, REPEATS)
+        scan_time = time_per_query(lambda q: substring_scan(podcasts, q), query, 5)
+        print(f'{query!r:>22} {title_hits:>13} {all_hits:>11} {title_time * 1e3:>7.3f} ms {all_time * 1e3:>7.3f} ms '
+              f'{ordered_time * 1e3:>10.3f} ms {scan_time * 1e3:>8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Memory use of the database repository over 100k requests, with and without a session per request.
+
+Each request loads a random podcast the way /description/<id> does. Live Python objects are counted every 10k
+requests, after a garbage collection, along with the process's peak resident size. With register_session_hooks the
+counts should stay flat: each request's session, and everything its identity map loaded, is dropped when it ends.
+
+Run from the project directory: `python -m benchmarks.session_soak`.
+"""
+import gc
+import random
+import resource
+import time
+
+from flask import Flask
+
+from benchmarks.description_latency import ID_STEP, database_repository
+from podcast import register_session_hooks
+from podcast.description.services import get_podcast_by_id
+
+NUMBER_OF_PODCASTS = 10_000
+REQUESTS = 100_000
+SAMPLE_EVERY = 10_000
+
+
+def make_app(repo, hooks: bool) -> Flask:
+    app = Flask(__name__)
+    if hooks:
+        register_session_hooks(app, repo)
+
+    @app.route('/description/<int:podcast_id>')
+    def show_description(podcast_id):
+        return get_podcast_by_id(podcast_id, repo)['title']
+
+    return app
+
+
+def soak(hooks: bool):
+    repo = database_repository(NUMBER_OF_PODCASTS)
+    client = make_app(repo, hooks).test_client()
+    ids = [1 + random.randrange(NUMBER_OF_PODCASTS) * ID_STEP for _ in range(REQUESTS)]
+    print(f'{"session per request" if hooks else "one shared session"}')
+    print(f'{"requests":>10} {"live objects":>13} {"peak RSS":>10} {"us/request":>11}')
+    start = time.perf_counter()
+    for count, podcast_id in enumerate(ids, start=1):
+        client.get(f'/description/{podcast_id}')
+        if count % SAMPLE_EVERY == 0:
+            elapsed = time.perf_counter() - start
+            gc.collect()
+            peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f'{count:>10} {len(gc.get_objects()):>13} {peak_mib:>6.1f} MiB {elapsed / SAMPLE_EVERY * 1e6:>11.1f}')
+            start = time.perf_counter()
+    repo.close_session()
+
+
+def main():
+    random.seed(0)
+    soak(hooks=True)
+    soak(hooks=False)
+
+
+if __name__ == '__main__':
+    main()
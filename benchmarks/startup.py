@@ -0,0 +1,43 @@
+"""Cold start of the memory repository: parsing the CSV files versus loading the catalogue snapshot.
+
+Run from the project directory: `python -m benchmarks.startup`.
+"""
+import os
+import tempfile
+import time
+
+from podcast.adapters.memory_repository import MemoryRepository
+from podcast.adapters.repository_populate import populate
+
+DATA_PATH = 'podcast/adapters/'
+REPEATS = 5
+
+
+def time_populate(snapshot_path: str = None) -> float:
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        populate(DATA_PATH, MemoryRepository(), False, snapshot_path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, 'catalogue.snapshot')
+        csv_time = time_populate()
+
+        start = time.perf_counter()
+        populate(DATA_PATH, MemoryRepository(), False, snapshot_path)
+        build_time = time.perf_counter() - start
+
+        snapshot_time = time_populate(snapshot_path)
+
+    print(f'parse csv files       {csv_time * 1000:8.1f} ms')
+    print(f'parse and write       {build_time * 1000:8.1f} ms')
+    print(f'load snapshot         {snapshot_time * 1000:8.1f} ms')
+    print(f'speed-up              {csv_time / snapshot_time:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""User lookup latency in MemoryRepository with up to 1M registered users.
+
+Every login, registration, playlist view and review post starts with repo.get_user(username). The lookup should take
+the same time however many users are registered. The linear scan it replaced is timed alongside for comparison.
+Password hashing is left out, as its cost does not depend on the number of users.
+
+Run from the project directory: `python -m benchmarks.user_lookup`.
+"""
+import random
+import time
+
+from podcast.adapters.memory_repository import MemoryRepository
+from podcast.domainmodel.model import User
+
+SIZES = [1_000, 100_000, 1_000_000]
+LOOKUPS = 10_000
+SCANS = 20
+
+
+def registered_users(number_of_users: int):
+    return [User(user_id, f'user{user_id}', 'not-a-real-hash') for user_id in range(1, number_of_users + 1)]
+
+
+def time_per_call(function, arguments) -> float:
+    start = time.perf_counter()
+    for argument in arguments:
+        function(argument)
+    return (time.perf_counter() - start) / len(arguments)
+
+
+def main():
+    random.seed(0)
+    print(f'{"users":>10} {"get_user":>12} {"linear scan":>14}')
+    for size in SIZES:
+        users = registered_users(size)
+        repo = MemoryRepository()
+        for user in users:
+            repo.add_user(user)
+
+        names = [f'user{random.randint(1, size)}' for _ in range(LOOKUPS)]
+        indexed = time_per_call(repo.get_user, names)
+
+        def linear_scan(username):
+            return next((user for user in users if user.username == username), None)
+
+        scanned = time_per_call(linear_scan, names[:SCANS])
+        print(f'{size:>10} {indexed * 1e6:>9.2f} us {scanned * 1e3:>11.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
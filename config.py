@@ -20,9 +20,26 @@ class Config:
 
     REPOSITORY = environ.get('REPOSITORY')
 
+    # Snapshot of the parsed CSV catalogue used to speed up start-up of the memory repository
+    CATALOGUE_SNAPSHOT = environ.get('CATALOGUE_SNAPSHOT')
+
+    # Treat usernames that differ only in case as the same user (memory repository)
+    CASE_INSENSITIVE_USERNAMES = environ.get('CASE_INSENSITIVE_USERNAMES', 'False').lower() == 'true'
+
     # Database configuration
     SQLALCHEMY_DATABASE_URI = environ.get('SQLALCHEMY_DATABASE_URI')
 
+    # SQLite tuning: 'performance' (WAL, synchronous=NORMAL, page cache, mmap, pooled connections) or 'default'
+    DATABASE_PROFILE = environ.get('DATABASE_PROFILE', 'performance')
+    DATABASE_POOL_SIZE = int(environ.get('DATABASE_POOL_SIZE', 5))
+    DATABASE_MAX_OVERFLOW = int(environ.get('DATABASE_MAX_OVERFLOW', 10))
+    DATABASE_POOL_TIMEOUT = float(environ.get('DATABASE_POOL_TIMEOUT', 30))
+    SQLITE_CACHE_SIZE_KIB = int(environ.get('SQLITE_CACHE_SIZE_KIB', 64 * 1024))
+    SQLITE_MMAP_SIZE = int(environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+    # Number of rows per executemany() batch when populating the database
+    DATABASE_BATCH_SIZE = int(environ.get('DATABASE_BATCH_SIZE', 1000))
+
     echo_string = environ.get('SQLALCHEMY_ECHO')
     SQLALCHEMY_ECHO = False
     if echo_string:
@@ -7,20 +7,33 @@ from flask import Flask, render_template, request
 from pathlib import Path
 
 # imports from SQLAlchemy
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import inspect
 from sqlalchemy.orm import sessionmaker, clear_mappers
-from sqlalchemy.pool import NullPool
 
 import podcast.adapters.repository as repo
+from podcast.adapters.database_engine import create_database_engine
 from podcast.adapters.database_repository import SqlAlchemyRepository
 from podcast.adapters.repository_populate import populate
-from podcast.adapters.orm import mapper_registry, map_model_to_tables
+from podcast.adapters.orm import mapper_registry, map_model_to_tables, upgrade_schema
 
 
 from podcast.adapters.memory_repository import MemoryRepository
 from podcast.domainmodel.model import User
 
 
+def register_session_hooks(app: Flask, repository: SqlAlchemyRepository):
+    """ Gives every request a database session of its own, closed when the request ends, so loaded objects do not
+    build up or go stale across requests. """
+
+    @app.before_request
+    def open_database_session():
+        repository.open_request_session()
+
+    @app.teardown_request
+    def close_database_session(exception=None):
+        repository.close_request_session()
+
+
 def create_app(test_config=None):
     """Construct the core application."""
 
@@ -38,9 +51,9 @@ def create_app(test_config=None):
 
     if app.config['REPOSITORY'] == 'memory':
         # for mem repo
-        repo.repo_instance = MemoryRepository()
+        repo.repo_instance = MemoryRepository(app.config.get('CASE_INSENSITIVE_USERNAMES', False))
         database_mode = False
-        populate(data_path, repo.repo_instance, database_mode)
+        populate(data_path, repo.repo_instance, database_mode, app.config.get('CATALOGUE_SNAPSHOT'))
 
     elif app.config['REPOSITORY'] == 'database':
         # SQLALCHEMY DB
@@ -48,15 +61,22 @@ def create_app(test_config=None):
         app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
         app.config['SQLALCHEMY_ECHO'] = True  # echo SQL statements - useful for debugging
 
-        # Create a database engine and connect it to the specified database
-        database_engine = create_engine(database_uri, connect_args={"check_same_thread": False}, poolclass=NullPool,
-                                        echo=False)
+        # Create a database engine and connect it to the specified database, tuned by the configured profile
+        database_engine = create_database_engine(database_uri,
+                                                 profile=app.config.get('DATABASE_PROFILE', 'performance'),
+                                                 pool_size=app.config.get('DATABASE_POOL_SIZE', 5),
+                                                 max_overflow=app.config.get('DATABASE_MAX_OVERFLOW', 10),
+                                                 pool_timeout=app.config.get('DATABASE_POOL_TIMEOUT', 30),
+                                                 cache_size_kib=app.config.get('SQLITE_CACHE_SIZE_KIB'),
+                                                 mmap_size=app.config.get('SQLITE_MMAP_SIZE'),
+                                                 echo=False)
 
         # Create the database session factory using sessionmaker (this has to be done once, in a global manner)
         session_factory = sessionmaker(autocommit=False, autoflush=True, bind=database_engine)
 
         # Create the SQLAlchemy DatabaseRepository instance for an sqlite3-based repository.
-        repo.repo_instance = SqlAlchemyRepository(session_factory)
+        repo.repo_instance = SqlAlchemyRepository(session_factory, app.config.get('DATABASE_BATCH_SIZE', 1000))
+        register_session_hooks(app, repo.repo_instance)
 
         if len(inspect(database_engine).get_table_names()) == 0:
             print("REPOPULATING DATABASE...")
@@ -77,7 +97,9 @@ def create_app(test_config=None):
             print("REPOPULATING DATABASE... FINISHED")
 
         else:
-            # Solely generate mappings that map domain model classes to the database tables.
+            # Add any indexes the existing database is missing, then solely generate mappings that map domain model
+            # classes to the database tables.
+            upgrade_schema(database_engine)
             map_model_to_tables()
 
     with app.app_context():
@@ -0,0 +1,55 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool, QueuePool
+
+# PRAGMAs applied to every new SQLite connection, per profile.
+# 'default' keeps SQLite's own settings (rollback journal, synchronous=FULL) and opens a connection per checkout.
+# 'performance' uses write-ahead logging, which lets readers run alongside a writer and makes synchronous=NORMAL
+# safe against corruption, plus a larger page cache, memory-mapped reads and in-memory temporary tables.
+SQLITE_PROFILES = {
+    'default': {},
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64 * 1024,  # negative values are in KiB, so 64 MiB
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def sqlite_pragmas(profile: str, cache_size_kib: int = None, mmap_size: int = None) -> dict:
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown database profile '{profile}', expected one of {sorted(SQLITE_PROFILES)}.")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    if pragmas and cache_size_kib is not None:
+        pragmas['cache_size'] = -cache_size_kib
+    if pragmas and mmap_size is not None:
+        pragmas['mmap_size'] = mmap_size
+    return pragmas
+
+
+def create_database_engine(database_uri: str, profile: str = 'performance', pool_size: int = 5,
+                           max_overflow: int = 10, pool_timeout: float = 30, cache_size_kib: int = None,
+                           mmap_size: int = None, echo: bool = False) -> Engine:
+    """ Creates the SQLite engine for the database repository using the given performance profile. """
+    pragmas = sqlite_pragmas(profile, cache_size_kib, mmap_size)
+    if pragmas:
+        # Keep pool_size connections (and their page caches) open between requests instead of reopening the file
+        # each time. Up to max_overflow more are opened under load; beyond that a checkout waits up to
+        # pool_timeout seconds for a connection to be returned, then fails.
+        engine = create_engine(database_uri, connect_args={"check_same_thread": False}, poolclass=QueuePool,
+                               pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout,
+                               echo=echo)
+    else:
+        engine = create_engine(database_uri, connect_args={"check_same_thread": False}, poolclass=NullPool,
+                               echo=echo)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
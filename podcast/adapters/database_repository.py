@@ -1,12 +1,31 @@
+import time
 from abc import ABC
-from typing import List, Type
+from datetime import datetime
+from typing import Iterable, List, Type
 
-from sqlalchemy import func, case
-from sqlalchemy.orm import scoped_session
+from itertools import islice
+
+from sqlalchemy import Integer, bindparam, delete, func, case, insert, inspect, literal, select, text, tuple_
+from sqlalchemy.orm import scoped_session, joinedload, selectinload
 from sqlalchemy.orm.exc import NoResultFound
 
-from podcast.adapters.repository import AbstractRepository
-from podcast.domainmodel.model import Podcast, Author, Category, User, Review, Episode, Playlist
+from podcast.adapters.repository import AbstractRepository, PlaylistEntry, PlaylistPage, RatingSummary, SearchPage
+from podcast.adapters.orm import (authors_table, categories_table, podcast_table, podcast_categories_table,
+                                  episode_table, reviews_table, playlists_episodes_table, search_row,
+                                  PODCAST_SEARCH_TABLE, PODCAST_SEARCH_COLUMNS, insert_podcast_search_row,
+                                  delete_podcast_search_row, EPISODE_SEARCH_TABLE, EPISODE_SEARCH_COLUMNS,
+                                  insert_episode_search_row, delete_episode_search_row)
+from podcast.adapters.search_index import (FIELD_WEIGHTS, EPISODE_FIELD_WEIGHTS, MIN_PREFIX_LENGTH, SEARCH_ORDERS,
+                                           podcast_fields, episode_fields, tokenize)
+from podcast.domainmodel.model import (Podcast, Author, Category, User, Review, Episode, Playlist,
+                                      validate_non_negative_int, validate_non_empty_string)
+
+# Number of rows sent per executemany() call when populating the database
+DEFAULT_BATCH_SIZE = 1000
+
+# Seconds the number of podcasts behind the catalogue's page count is cached for. Podcasts added through the
+# repository drop it straight away; ones added by another process show up once it expires.
+CATALOGUE_COUNT_TTL = 30.0
 
 
 # feature 1 test
@@ -41,15 +60,178 @@ class SessionContextManager:
         if not self.__session is None:
             self.__session.close()
 
+    # The identity map is only ever emptied at these request boundaries, never while a request may still hold
+    # objects whose lazy relationships need the session
+    def open_request_session(self):
+        # Start the current thread on a session of its own, discarding any it was left holding
+        self.__session.remove()
+        self.__session()
+
+    def close_request_session(self):
+        # Close the current thread's session, rolling back anything left uncommitted, and drop it from the registry
+        # along with everything its identity map loaded
+        self.__session.remove()
+
+
+def batched(rows: Iterable[dict], batch_size: int):
+    iterator = iter(rows)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def author_to_row(author: Author) -> dict:
+    return {'author_id': author.id, 'name': author.name}
+
+
+def category_to_row(category: Category) -> dict:
+    return {'category_id': category.id, 'category_name': category.name}
+
+
+def podcast_to_row(podcast: Podcast) -> dict:
+    return {
+        'podcast_id': podcast.id,
+        'title': podcast.title,
+        'image_url': podcast.image,
+        'description': podcast.description,
+        'language': podcast.language,
+        'website_url': podcast.website,
+        'author_id': podcast.author.id if podcast.author is not None else None,
+        'itunes_id': podcast.itunes_id,
+        'sort_key': podcast.sort_key,
+    }
+
+
+def episode_to_row(episode: Episode) -> dict:
+    return {
+        'episode_id': episode.id,
+        'podcast_id': episode.pod_id,
+        'title': episode.title,
+        'episode_link': episode.link,
+        'episode_length': episode.length,
+        'description': episode.description,
+        'pub_date': episode.pub_date,
+        'pub_timestamp': episode.pub_timestamp,
+        'sort_key': episode.sort_key,
+    }
+
+
+def podcast_to_search_row(podcast: Podcast) -> dict:
+    return search_row(podcast.id, podcast_fields(podcast), PODCAST_SEARCH_COLUMNS)
+
+
+def episode_to_search_row(episode: Episode) -> dict:
+    return search_row(episode.id, episode_fields(episode), EPISODE_SEARCH_COLUMNS)
+
+
+def search_match_expression(query: str, field: str = None, columns: List[str] = PODCAST_SEARCH_COLUMNS):
+    """ Builds an FTS5 MATCH expression requiring every word of the query, each as a word prefix from
+    MIN_PREFIX_LENGTH characters and as a whole word below that, in the given column (or any column). Returns None
+    when there is nothing to search for. """
+    words = list(dict.fromkeys(tokenize(query)))
+    if not words or (field is not None and field not in columns):
+        return None
+    # Words are quoted so FTS5 never reads them as operators; tokenize() only yields word characters
+    terms = [f'"{word}"*' if len(word) >= MIN_PREFIX_LENGTH else f'"{word}"' for word in words]
+    if field is not None:
+        terms = [f'{field} : {term}' for term in terms]
+    return ' AND '.join(terms)
+
+
+def search_page_statement(table: str, key: str, search_table: str, weights: dict, order: str):
+    """ Selects one page of the rows of table matching an FTS5 expression on search_table, in the given order,
+    with the key column breaking ties (a limit of -1 means no limit). """
+    if order == 'relevance':
+        # bm25 is lower for better matches
+        order_by = f"bm25({search_table}, {', '.join(str(weight) for weight in weights.values())})"
+    elif order == 'title':
+        # The stored title_sort_key(title), so the order matches the memory repository's for every title
+        order_by = f"{table}.sort_key"
+    else:
+        raise ValueError(f"Unknown search order '{order}'.")
+    return text(f"SELECT {table}.* FROM {table} JOIN {search_table} ON {search_table}.rowid = {table}.{key} "
+                f"WHERE {search_table} MATCH :match ORDER BY {order_by}, {table}.{key} LIMIT :limit OFFSET :offset")
+
+
+def count_matches_statement(search_table: str):
+    return text(f"SELECT count(*) FROM {search_table} WHERE {search_table} MATCH :match")
+
+
+search_podcasts_statements = {
+    order: search_page_statement('podcasts', 'podcast_id', PODCAST_SEARCH_TABLE, FIELD_WEIGHTS, order)
+    for order in SEARCH_ORDERS}
+search_episodes_statements = {
+    order: search_page_statement('episodes', 'episode_id', EPISODE_SEARCH_TABLE, EPISODE_FIELD_WEIGHTS, order)
+    for order in SEARCH_ORDERS}
+count_podcast_matches_statement = count_matches_statement(PODCAST_SEARCH_TABLE)
+count_episode_matches_statement = count_matches_statement(EPISODE_SEARCH_TABLE)
+
+
+# Loader profiles: the relationships each page reads from the podcasts it shows, loaded with the podcasts in a fixed
+# number of queries however many there are. They are built per query as the attributes only exist once mapped.
+def catalogue_load_options() -> tuple:
+    # Catalogue and home page cards show each podcast's author and categories
+    return joinedload(Podcast._author), selectinload(Podcast.categories)
+
+
+def search_load_options() -> tuple:
+    # Search results show the author only. Results come from a textual statement, which a join cannot be added to.
+    return selectinload(Podcast._author),
+
+
+def description_load_options() -> tuple:
+    # The description page also lists the reviews, each with its writer
+    return (joinedload(Podcast._author), selectinload(Podcast.categories),
+            selectinload(Podcast.reviews).joinedload(Review._writer))
+
+
+def object_id(entity) -> int:
+    # The id of a persistent object is known from its identity key, without the refresh that reading an attribute
+    # of an object expired by a commit would cost
+    identity = inspect(entity).identity
+    return identity[0] if identity else entity.id
+
+
+# Adds one episode to a playlist unless it is already there, in a single statement
+add_playlist_episode_statement = insert(playlists_episodes_table).from_select(
+    ['playlist_id', 'episode_id'],
+    select(bindparam('playlist', type_=Integer), bindparam('episode', type_=Integer)).where(
+        ~select(playlists_episodes_table.c.id).where(
+            playlists_episodes_table.c.playlist_id == bindparam('playlist'),
+            playlists_episodes_table.c.episode_id == bindparam('episode')).exists()))
+remove_playlist_episode_statement = delete(playlists_episodes_table).where(
+    playlists_episodes_table.c.playlist_id == bindparam('playlist'),
+    playlists_episodes_table.c.episode_id == bindparam('episode'))
+
 
 class SqlAlchemyRepository(AbstractRepository, ABC):
 
-    def __init__(self, session_factory):
+    def __init__(self, session_factory, batch_size: int = DEFAULT_BATCH_SIZE):
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer.")
         self._session_cm = SessionContextManager(session_factory)
+        self._batch_size = batch_size
+        # The number of podcasts and when it was counted; see CATALOGUE_COUNT_TTL
+        self._catalogue_count = None
+        self._catalogue_counted_at = 0.0
+
+    def _bulk_insert(self, table, rows: Iterable[dict]):
+        """ Inserts rows with Core executemany() calls of at most batch_size rows, in one transaction.
+        Rows whose key already exists are skipped on SQLite, like the per-row merges this replaces. """
+        statement = insert(table).prefix_with('OR IGNORE', dialect='sqlite')
+        with self._session_cm as scm:
+            for batch in batched(rows, self._batch_size):
+                scm.session.execute(statement, batch)
+            scm.commit()
 
     def close_session(self):
         self._session_cm.close_current_session()
 
+    def open_request_session(self):
+        self._session_cm.open_request_session()
+
+    def close_request_session(self):
+        self._session_cm.close_request_session()
+
     def reset_session(self):
         self._session_cm.reset_session()
 
@@ -61,8 +243,10 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
     def get_podcast(self, podcast_id: int) -> Podcast:
         podcast = None
         try:
-            query = self._session_cm.session.query(Podcast).filter(
-                Podcast._id == podcast_id)
+            # Load the author, categories and reviewers shown on the description page up front, instead of one
+            # lazy query per relationship
+            query = self._session_cm.session.query(Podcast).options(
+                *description_load_options()).filter(Podcast._id == podcast_id)
             podcast = query.one()
         except NoResultFound:
             print(f'Podcast {podcast_id} was not found')
@@ -72,13 +256,35 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
     def add_podcast(self, podcast: Podcast):
         with self._session_cm as scm:
             scm.session.merge(podcast)
+            self._index_podcasts(scm.session, [podcast])
             scm.commit()
+        self._catalogue_count = None
 
     def add_multiple_podcasts(self, podcasts: List[Podcast]):
+        # Authors and categories are expected to be in the database already (see populate)
+        self._bulk_insert(podcast_table, (podcast_to_row(podcast) for podcast in podcasts))
+        self._bulk_insert(podcast_categories_table,
+                          ({'podcast_id': podcast.id, 'category_id': category.id}
+                           for podcast in podcasts for category in podcast.categories))
         with self._session_cm as scm:
-            for podcast in podcasts:
-                scm.session.add(podcast)
+            self._index_podcasts(scm.session, podcasts)
             scm.commit()
+        self._catalogue_count = None
+
+    def _index_rows(self, session, delete_statement, insert_statement, rows: Iterable[dict]):
+        # Replaces rows in a full-text search table, batch_size rows per statement
+        for batch in batched(rows, self._batch_size):
+            session.execute(delete_statement, [{'rowid': row['rowid']} for row in batch])
+            session.execute(insert_statement, batch)
+
+    def _index_podcasts(self, session, podcasts: Iterable[Podcast]):
+        self._index_rows(session, delete_podcast_search_row, insert_podcast_search_row,
+                         (podcast_to_search_row(podcast) for podcast in podcasts))
+
+    def _index_episodes(self, session, episodes: Iterable[Episode]):
+        # The HTML is stripped from the descriptions here, once, rather than at every search
+        self._index_rows(session, delete_episode_search_row, insert_episode_search_row,
+                         (episode_to_search_row(episode) for episode in episodes))
 
     def get_number_of_podcasts(self) -> int:
         num_podcasts = self._session_cm.session.query(Podcast).count()
@@ -97,15 +303,17 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
             scm.commit()
 
     def add_multiple_authors(self, authors: List[Author]):
+        # One query for every existing name instead of one per author
         with self._session_cm as scm:
-            with scm.session.no_autoflush:
-                for author in authors:
-                    existing_author = scm.session.query(Author).filter_by(name=author.name).first()
-                    if existing_author:
-                        print(f"Author '{author.name}' already exists, skipping.")
-                        continue
-                    scm.session.add(author)
-            scm.commit()
+            existing_names = set(scm.session.execute(select(authors_table.c.name)).scalars())
+        rows = []
+        for author in authors:
+            if author.name in existing_names:
+                print(f"Author '{author.name}' already exists, skipping.")
+                continue
+            existing_names.add(author.name)
+            rows.append(author_to_row(author))
+        self._bulk_insert(authors_table, rows)
 
     def get_number_of_authors(self) -> int:
         num_authors = self._session_cm.session.query(Author).count()
@@ -124,11 +332,7 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
             scm.commit()
 
     def add_multiple_categories(self, categories: List[Category]):
-        with self._session_cm as scm:
-            with scm.session.no_autoflush:
-                for category in categories:
-                    scm.session.add(category)
-            scm.commit()
+        self._bulk_insert(categories_table, (category_to_row(category) for category in categories))
 
     # endregion
 
@@ -151,12 +355,15 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
     def add_episode(self, episode: Episode):
         with self._session_cm as scm:
             scm.session.merge(episode)
+            self._index_episodes(scm.session, [episode])
             scm.commit()
 
-    def add_multiple_episodes(self, episode: List[Episode]):
+    def add_multiple_episodes(self, episodes: Iterable[Episode]):
+        # Core inserts never put the episodes in the session, so streaming many chunks keeps memory flat
+        episodes = list(episodes)
+        self._bulk_insert(episode_table, (episode_to_row(episode) for episode in episodes))
         with self._session_cm as scm:
-            for episode in episode:
-                scm.session.merge(episode)
+            self._index_episodes(scm.session, episodes)
             scm.commit()
 
     def get_number_of_episodes(self) -> int:
@@ -164,11 +371,12 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
         return num_episodes
 
     def get_episodes_for_podcast(self, podcast_id: int) -> List[Episode]:
-        """Get all episodes for a specific podcast by podcast_id."""
+        """Get all episodes for a specific podcast by podcast_id, oldest first."""
         with self._session_cm as scm:
             episodes = scm.session.query(Episode).filter(
-                Episode._podcast_id == podcast_id).all()
+                Episode._podcast_id == podcast_id).order_by(Episode._pub_timestamp, Episode._id).all()
             return episodes
+
     def get_number_of_episodes_for_podcast(self, podcast_id: int) -> int:
         """ Returns the number of episodes for a particular podcast by podcast_id. """
         count = 0
@@ -182,30 +390,28 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
 
     # endregion
 
-    def search_podcast_by_title(self, title_string: str) -> List[Podcast]:
-
-        with self._session_cm as scm:
-            podcasts = scm.session.query(Podcast).filter(
-                Podcast._title.ilike(f'%{title_string.strip()}%')).all()
-        return podcasts
-
-    def search_podcast_by_author(self, author_name: str) -> List[Podcast]:
-        with self._session_cm as scm:
-            podcasts = scm.session.query(Podcast).join(Author).filter(
-                Author._name.ilike(f'%{author_name}%')).all()
-            return podcasts
-
-    def search_podcast_by_category(self, category_string: str) -> List[Podcast]:
-        with self._session_cm as scm:
-            podcasts = scm.session.query(Podcast).join(Podcast.categories).filter(
-                Category._name.ilike(f'%{category_string}%')).all()
-        return podcasts
-
-    def search_podcast_by_language(self, language_string: str) -> List[Podcast]:
-        with self._session_cm as scm:
-            podcasts = scm.session.query(Podcast).filter(
-                Podcast._language.ilike(f'%{language_string}%')).all()
-            return podcasts
+    def search_podcasts(self, query: str, field: str = None, offset: int = 0, limit: int = None,
+                        order: str = 'relevance') -> SearchPage:
+        return self._search_page(Podcast, search_podcasts_statements, count_podcast_matches_statement,
+                                 search_match_expression(query, field), offset, limit, order, search_load_options())
+
+    def search_episodes(self, query: str, offset: int = 0, limit: int = None, order: str = 'relevance') -> SearchPage:
+        return self._search_page(Episode, search_episodes_statements, count_episode_matches_statement,
+                                 search_match_expression(query, columns=EPISODE_SEARCH_COLUMNS), offset, limit, order)
+
+    def _search_page(self, entity, statements: dict, count_statement, match: str, offset: int, limit: int,
+                     order: str, load_options: tuple = ()) -> SearchPage:
+        # A COUNT on the search table for the total, then only the rows on the requested page are loaded
+        if order not in statements:
+            raise ValueError(f"Unknown search order '{order}'.")
+        if match is None:
+            return SearchPage([], 0)
+        session = self._session_cm.session
+        total = session.execute(count_statement, {'match': match}).scalar()
+        statement = select(entity).options(*load_options).from_statement(statements[order])
+        results = session.execute(statement, {'match': match, 'offset': offset,
+                                              'limit': -1 if limit is None else limit}).scalars().all()
+        return SearchPage(results, total)
 
     # stuff from mem_repo
     def set_podcasts(self, podcast: Podcast):
@@ -215,18 +421,37 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
         pass
 
     def get_podcasts_by_alphabet(self, list_of_names):
-        podcasts = self._session_cm.session.query(Podcast).order_by(Podcast._title.asc()).all()
-
-        def custom_sort_key(podcast):
-            title = podcast.title
-            if title[0].isalpha():
-                return 0, title.lower()
-            else:
-                return 1, title.lower()
-
-        podcasts = sorted(podcasts, key=custom_sort_key)
+        # Read in catalogue order through the sort_key index, with no sorting left to do in Python
+        podcasts = self._session_cm.session.query(Podcast).options(*catalogue_load_options()).order_by(
+            Podcast._sort_key, Podcast._id).all()
         return podcasts
 
+    def _get_catalogue_count(self) -> int:
+        now = time.monotonic()
+        if self._catalogue_count is None or now - self._catalogue_counted_at >= CATALOGUE_COUNT_TTL:
+            self._catalogue_count = self._session_cm.session.execute(
+                select(func.count()).select_from(podcast_table)).scalar()
+            self._catalogue_counted_at = now
+        return self._catalogue_count
+
+    def get_catalogue_page(self, offset: int, limit: int) -> List[Podcast]:
+        # Keyset pagination: the page starts after the key of the podcast before it, so SQLite seeks straight
+        # there in the index instead of loading and discarding offset podcasts
+        query = self._session_cm.session.query(Podcast).options(*catalogue_load_options())
+        if offset > 0:
+            # That key is read from the covering index alone, stepping over index entries rather than rows
+            boundary = self._session_cm.session.execute(
+                select(podcast_table.c.sort_key, podcast_table.c.podcast_id)
+                .order_by(podcast_table.c.sort_key, podcast_table.c.podcast_id)
+                .offset(offset - 1).limit(1)).first()
+            if boundary is None:
+                return []
+            query = query.filter(tuple_(Podcast._sort_key, Podcast._id) > tuple(boundary))
+        return query.order_by(Podcast._sort_key, Podcast._id).limit(limit).all()
+
+    def get_catalogue_page_count(self, page_size: int) -> int:
+        return (self._get_catalogue_count() + page_size - 1) // page_size
+
     def get_category(self, category_name) -> Category:
         with self._session_cm as scm:
             category = scm.session.query(Category).filter(Category._name == category_name).one_or_none()
@@ -239,31 +464,88 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
         podcasts = self._session_cm.session.query(Podcast).order_by(Podcast._id.asc()).all()
         return podcasts
 
-    def update_users_playlist(self, playlist: Playlist):
-        try:
-            existing_playlist = self._session_cm.session.query(Playlist).filter(Playlist._id == playlist.id).one_or_none()
-            if existing_playlist:
-                existing_playlist._episodes = playlist.list_of_episodes
+    def get_playlist_page(self, playlist: Playlist, offset: int, limit: int) -> PlaylistPage:
+        # One query for the page, joining each episode to its podcast, and a COUNT over the playlist_id index;
+        # neither loads the rest of the playlist
+        playlist_id = object_id(playlist)
+        session = self._session_cm.session
+        rows = session.execute(
+            select(Episode, podcast_table.c.title, podcast_table.c.image_url)
+            .select_from(playlists_episodes_table)
+            .join(episode_table, episode_table.c.episode_id == playlists_episodes_table.c.episode_id)
+            .outerjoin(podcast_table, podcast_table.c.podcast_id == episode_table.c.podcast_id)
+            .where(playlists_episodes_table.c.playlist_id == playlist_id)
+            .order_by(playlists_episodes_table.c.id)
+            .offset(offset).limit(limit)).all()
+        total = session.execute(select(func.count()).select_from(playlists_episodes_table)
+                                .where(playlists_episodes_table.c.playlist_id == playlist_id)).scalar()
+        return PlaylistPage([PlaylistEntry(episode, episode.pod_id, title, image) for episode, title, image in rows],
+                            total)
+
+    # Playlist episodes are written as playlist_episodes rows directly, touching only the rows that change. Committing
+    # expires the playlist, so its episodes are read again the next time they are used.
+    def add_episodes_to_playlist(self, playlist: Playlist, episodes: Iterable[Episode]) -> int:
+        playlist_id = object_id(playlist)
+        rows = [{'playlist': playlist_id, 'episode': object_id(episode)} for episode in episodes]
+        if not rows:
+            return 0
+        with self._session_cm as scm:
+            added = scm.session.execute(add_playlist_episode_statement, rows).rowcount
+            scm.commit()
+        return added
 
-            else:
-                pass
-            self._session_cm.session.commit()
-        except Exception as e:
-            self._session_cm.session.rollback()
-            raise e
+    def remove_episodes_from_playlist(self, playlist: Playlist, episodes: Iterable[Episode]) -> int:
+        playlist_id = object_id(playlist)
+        rows = [{'playlist': playlist_id, 'episode': object_id(episode)} for episode in episodes]
+        if not rows:
+            return 0
+        with self._session_cm as scm:
+            removed = scm.session.execute(remove_playlist_episode_statement, rows).rowcount
+            scm.commit()
+        return removed
+
+    def add_podcast_episodes_to_playlist(self, playlist: Playlist, podcast_id: int) -> int:
+        # One INSERT ... SELECT of the podcast's episodes that are not in the playlist yet, oldest first
+        playlist_id = object_id(playlist)
+        in_playlist = select(playlists_episodes_table.c.episode_id).where(
+            playlists_episodes_table.c.playlist_id == playlist_id)
+        new_episodes = select(literal(playlist_id), episode_table.c.episode_id).where(
+            episode_table.c.podcast_id == podcast_id, episode_table.c.episode_id.not_in(in_playlist)
+        ).order_by(episode_table.c.pub_timestamp, episode_table.c.episode_id)
+        with self._session_cm as scm:
+            added = scm.session.execute(insert(playlists_episodes_table).from_select(
+                ['playlist_id', 'episode_id'], new_episodes)).rowcount
+            scm.commit()
+        return added
+
+    def remove_podcast_episodes_from_playlist(self, playlist: Playlist, podcast_id: int) -> int:
+        podcast_episodes = select(episode_table.c.episode_id).where(episode_table.c.podcast_id == podcast_id)
+        with self._session_cm as scm:
+            removed = scm.session.execute(delete(playlists_episodes_table).where(
+                playlists_episodes_table.c.playlist_id == object_id(playlist),
+                playlists_episodes_table.c.episode_id.in_(podcast_episodes))).rowcount
+            scm.commit()
+        return removed
 
     def get_reviews(self) -> List[Review]:
         return self._session_cm.session.query(Review).all()
 
     def get_reviews_for_podcast(self, podcast_id: int) -> List[Review]:
         with self._session_cm as scm:
-            # Join the Review table with the Podcast table and filter based on Podcast._id
-            podcast_reviews = scm.session.query(Review).join(Review._podcast).filter(Podcast._id == podcast_id).all()
+            # Filter on the indexed foreign key directly; no need to join the podcasts table
+            podcast_reviews = scm.session.query(Review).filter(reviews_table.c.podcast_id == podcast_id).all()
             return podcast_reviews
 
+    def get_rating_summary(self, podcast_id: int) -> RatingSummary:
+        # COUNT and AVG over the reviews_podcast_id index, without loading any Review objects
+        count, average = self._session_cm.session.execute(
+            select(func.count(reviews_table.c.review_id), func.avg(reviews_table.c.rating))
+            .where(reviews_table.c.podcast_id == podcast_id)).one()
+        return RatingSummary(count, average or 0)
 
     def get_random_podcasts(self) -> List[Podcast]:
-        podcasts = self._session_cm.session.query(Podcast).order_by(func.random()).limit(10).all()
+        podcasts = self._session_cm.session.query(Podcast).options(*catalogue_load_options()).order_by(
+            func.random()).limit(10).all()
         return podcasts
 
     def get_user(self, user_name: str) -> User:
@@ -290,10 +572,25 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
             scm.session.add(review)
             scm.commit()
 
+    def create_review(self, user: User, podcast: Podcast, rating: int, comment: str) -> Review:
+        # Validate the same way the Review constructor does before anything is written
+        validate_non_negative_int(rating)
+        validate_non_empty_string(comment, "Review comment")
+        with self._session_cm as scm:
+            # Let the autoincrement column pick the id, so concurrent posts cannot be given the same one
+            result = scm.session.execute(insert(reviews_table).values(
+                review_text=comment, rating=rating, podcast_id=podcast.id, user_id=user.id,
+                timestamp=datetime.today()))
+            scm.commit()
+            return scm.session.get(Review, result.inserted_primary_key[0])
+
+    def get_user_by_id(self, user_id: int) -> User:
+        return self._session_cm.session.get(User, user_id)
+
     def add_user(self, user: User):
         with self._session_cm as scm:
             scm.session.add(user)
             scm.commit()
 
     def get_episodes_by_date(self, episodes: List[Episode]) -> List[Episode]:
-        pass
\ No newline at end of file
+        return sorted(episodes, key=lambda episode: (episode.pub_timestamp, episode.id))
\ No newline at end of file
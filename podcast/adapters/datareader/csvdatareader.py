@@ -1,5 +1,7 @@
 import os
 import csv
+from typing import Iterator, List
+
 from podcast.domainmodel.model import Podcast, Episode, Author, Category
 
 
@@ -11,6 +13,8 @@ class CSVDataReader:
         self.__dataset_of_episodes = []
         self.__dataset_of_authors = set()
         self.__dataset_of_categories = set()
+        self.__authors_by_name = dict()
+        self.__categories_by_name = dict()
 
     @property
     def __episode_path__(self) -> str:
@@ -36,51 +40,72 @@ class CSVDataReader:
     def dataset_of_categories(self) -> set:
         return self.__dataset_of_categories
 
-    def read_episodes(self):
-        podcast_lookup = {p.id: p for p in self.__dataset_of_podcasts}
+    def iter_episodes(self, chunk_size: int = 1000) -> Iterator[List[Episode]]:
+        """ Streams episodes.csv as lists of at most chunk_size episodes.
+        Episodes whose podcast has not been read by read_podcasts are skipped. Nothing is kept on the reader,
+        so memory use is bounded by the chunk size rather than the size of the file. """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer.")
+        podcast_ids = {p.id for p in self.__dataset_of_podcasts}
+        chunk = []
         with open(self.episode_file_path, mode='r', newline='', encoding='utf-8') as csvepisodefile:
             reader = csv.DictReader(csvepisodefile)
             for row in reader:
-                podcast_id =int(row['podcast_id'])
-                podcast = podcast_lookup.get(podcast_id)
-                if podcast is not None:
-                    new_episode = Episode(
-                        episode_id=int(row['id']),
-                        podcast_id=podcast_id,
-                        title=row['title'],
-                        episode_link=row['audio'],
-                        episode_length=int(row['audio_length']),
-                        episode_description=row['description'],
-                        pub_date=row['pub_date']
-                    )
-                if Episode not in self.__dataset_of_episodes:
-                    podcast.add_episode(new_episode)
-                    self.__dataset_of_episodes.append(new_episode)
+                podcast_id = int(row['podcast_id'])
+                if podcast_id not in podcast_ids:
+                    continue
+                chunk.append(Episode(
+                    episode_id=int(row['id']),
+                    podcast_id=podcast_id,
+                    title=row['title'],
+                    episode_link=row['audio'],
+                    episode_length=int(row['audio_length']),
+                    episode_description=row['description'],
+                    pub_date=row['pub_date']
+                ))
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+    def read_episodes(self):
+        podcast_lookup = {p.id: p for p in self.__dataset_of_podcasts}
+        seen_episode_ids = set()
+        for chunk in self.iter_episodes():
+            for episode in chunk:
+                if episode.id not in seen_episode_ids:
+                    seen_episode_ids.add(episode.id)
+                    # ids are unique here, so skip Podcast.add_episode's linear membership check
+                    podcast_lookup[episode.pod_id].episodes.append(episode)
+                    self.__dataset_of_episodes.append(episode)
+
+    def __intern_author(self, author_name: str) -> Author:
+        # Authors are interned by name so each name maps to one Author in O(1),
+        # with IDs handed out in order of first appearance.
+        author = self.__authors_by_name.get(author_name.strip())
+        if author is None:
+            author = Author(len(self.__authors_by_name) + 1, author_name)
+            self.__authors_by_name[author.name] = author
+            self.__dataset_of_authors.add(author)
+        return author
+
+    def __intern_category(self, category_name: str) -> Category:
+        category = self.__categories_by_name.get(category_name.strip())
+        if category is None:
+            category = Category(len(self.__categories_by_name) + 1, category_name)
+            self.__categories_by_name[category.name] = category
+            self.__dataset_of_categories.add(category)
+        return category
 
     def read_podcasts(self):
         with open(self.podcast_file_path, mode='r', newline='', encoding='utf-8') as podcast_file:
             podcasts_rows = csv.DictReader(podcast_file)
-            author_count = 1
-            category_count = 1
             for row in podcasts_rows:
                 author_name = row['author']
                 if author_name == '':
                     author_name = 'Unknown author'
-                if (author_name == 'Unknown author') and 'Unknown author' in [author.name for author in self.__dataset_of_authors]:
-                    for a in self.__dataset_of_authors:
-                        if a.name == 'Unknown author':
-                            author = a
-                else:
-                    author = Author(author_count, author_name)
-                    if author.name not in [a.name for a in self.__dataset_of_authors]:
-                        author_count += 1
-                        self.__dataset_of_authors.add(author)
-                    else:
-                        # Retrieve the existing author from the set to associate with the podcast
-                        for existing_author in self.__dataset_of_authors:
-                            if existing_author.name == author.name:
-                                author = existing_author
-                                break
+                author = self.__intern_author(author_name)
                 podcast = Podcast(
                     podcast_id=int(row['id']),
                     author=author,
@@ -93,15 +118,5 @@ class CSVDataReader:
                 )
                 category_names = row["categories"].split("|")
                 for category_name in category_names:
-                    category = Category(category_count, category_name.strip())
-                    if category.name not in [c.name for c in self.__dataset_of_categories]:
-                        self.__dataset_of_categories.add(category)
-                        category_count += 1
-                    else:
-                        # Retrieve the existing category from the set to associate with the podcast
-                        for existing_category in self.__dataset_of_categories:
-                            if existing_category.name == category.name:
-                                category = existing_category
-                                break
-                    podcast.add_category(category)
-                self.__dataset_of_podcasts.append(podcast)
\ No newline at end of file
+                    podcast.add_category(self.__intern_category(category_name))
+                self.__dataset_of_podcasts.append(podcast)
@@ -1,41 +1,69 @@
 import csv
 import os
 import random
+import threading
 from abc import ABC
 from bisect import insort_left
-# sorting by date
-from datetime import datetime
 
-from typing import List
+from typing import Iterable, List
 
 from podcast.domainmodel.model import Author, Podcast, Category, User, Episode, Review, Playlist
 from podcast.adapters.datareader.csvdatareader import CSVDataReader
+from podcast.adapters.search_index import EpisodeSearchIndex, PodcastSearchIndex
 
-from podcast.adapters.repository import AbstractRepository, RepositoryException
+from podcast.adapters.repository import (AbstractRepository, PlaylistEntry, PlaylistPage, RatingSummary,
+                                        RepositoryException, SearchPage)
+
+
+def episode_date_key(episode: Episode):
+    # Publication date order, with the episode id breaking ties between episodes published at the same time
+    return episode.pub_timestamp, episode.id
+
+
+def catalogue_key(podcast: Podcast):
+    # Alphabetical catalogue order, with the podcast id breaking ties between podcasts with the same title. The
+    # stored sort key is the one the database orders by, so both repositories list the catalogue alike.
+    return podcast.sort_key, podcast.id
 
 
 class MemoryRepository(AbstractRepository):
 
-    def __init__(self):
+    def __init__(self, case_insensitive_usernames: bool = False):
+        self.__case_insensitive_usernames = case_insensitive_usernames
         self.__podcasts = list()
         self.__podcasts_index = dict()
+        self.__catalogue = list()  # every podcast, kept in catalogue_key order
+        self.__search_index = PodcastSearchIndex()
         self.__episodes = list()
         self.__episodes_index = dict()
+        self.__episodes_by_podcast = dict()  # podcast id -> that podcast's episodes, kept in date order
+        self.__episode_search_index = EpisodeSearchIndex()
         self.__users = list()
+        self.__users_by_name = dict()
+        self.__users_by_id = dict()
         self.__authors = set()
         self.__categories = set()
         self.__reviews = list()
-        self.__playlists = list()
-        self.__playlists_index = dict()
+        self.__reviews_by_podcast = dict()  # podcast id -> reviews of that podcast
+        self.__rating_totals = dict()  # podcast id -> [number of reviews, sum of their ratings]
+        self.__last_review_id = 0
+        # Review ids are allocated and the review indexes updated under this lock, so concurrent posts never collide
+        self.__reviews_lock = threading.RLock()
+        self.__playlists = dict()  # playlist id -> playlist
+        self.__playlists_index = dict()  # user id -> that user's playlist
 
     def set_podcasts(self, podcasts: List[Podcast]):  # test done
         for podcast in podcasts:
             self.__podcasts_index[podcast.id] = podcast
         self.__podcasts = podcasts
+        self.__catalogue = sorted(podcasts, key=catalogue_key)
+        self.__search_index.add_all(podcasts)
 
     def add_podcast(self, podcast: Podcast):  # test done
         insort_left(self.__podcasts, podcast)
         self.__podcasts_index[podcast.id] = podcast
+        insort_left(self.__catalogue, podcast, key=catalogue_key)
+        self.__search_index.add(podcast)
 
     def get_podcast(self, pod_id: int) -> Podcast:  # test done
         podcast = None
@@ -50,35 +78,41 @@ class MemoryRepository(AbstractRepository):
         return self.__podcasts
 
     def add_episodes(self, episodes: List[Episode]):
-        self.__episodes = episodes
+        self.__episodes.extend(episodes)
+        self.__episode_search_index.add_all(episodes)
+        changed_podcasts = set()
+        for episode in episodes:
+            self.__episodes_index[episode.id] = episode
+            self.__episodes_by_podcast.setdefault(episode.pod_id, []).append(episode)
+            changed_podcasts.add(episode.pod_id)
+        # Sort each podcast's episodes once rather than inserting them one at a time
+        for podcast_id in changed_podcasts:
+            self.__episodes_by_podcast[podcast_id].sort(key=episode_date_key)
 
     def add_episode(self, episode: Episode):
         insort_left(self.__episodes, episode)
         self.__episodes_index[episode.id] = episode
+        self.__episode_search_index.add(episode)
+        insort_left(self.__episodes_by_podcast.setdefault(episode.pod_id, []), episode, key=episode_date_key)
 
     def get_episode(self, ep_id: int) -> Episode:
-        return self.__episodes[ep_id - 1]
+        # Looked up by id, as ids are neither contiguous nor guaranteed to match list positions
+        return self.__episodes_index.get(ep_id)
 
     def get_list_of_podcasts_titles(self) -> List[str]:  # test done
         return [podcast.title for podcast in self.__podcasts]
 
     def get_podcasts_by_alphabet(self, list_of_titles):  # test done
-        filtered_podcasts = [podcast for podcast in self.__podcasts if podcast.title in list_of_titles]
-
-        # sorted_podcasts = sorted(filtered_podcasts, key=lambda podcast: podcast.title)
-
-        # This is sorts it alphabetically but special characters
-        # and numbers are at the end instead
-        def custom_sort_key(podcast):
-            title = podcast.title
-            if title[0].isalpha():
-                return 0, title.lower()
-            else:
-                return 1, title.lower()
+        # The catalogue is already in alphabetical order (special characters and numbers at the end)
+        # A set for constant-time membership; a single title string keeps its substring membership test
+        titles = list_of_titles if isinstance(list_of_titles, str) else set(list_of_titles)
+        return [podcast for podcast in self.__catalogue if podcast.title in titles]
 
-        sorted_podcasts = sorted(filtered_podcasts, key=custom_sort_key)
+    def get_catalogue_page(self, offset: int, limit: int) -> List[Podcast]:
+        return self.__catalogue[offset:offset + limit]
 
-        return sorted_podcasts
+    def get_catalogue_page_count(self, page_size: int) -> int:
+        return (len(self.__catalogue) + page_size - 1) // page_size
 
     def get_random_podcasts(self) -> List['Podcast']:  # test done
         limit = 10
@@ -91,9 +125,8 @@ class MemoryRepository(AbstractRepository):
         return sorted_podcasts
 
     def get_episodes_by_date(self, episodes: List[Episode]) -> List[Episode]:  # test done
-        # Sort the episodes by their publication date
-        sorted_episodes = sorted(episodes, key=lambda episode: datetime.strptime(episode.pub_date + '00',
-                                                                                        '%Y-%m-%d %H:%M:%S%z'))
+        # Sort the episodes by their publication date, parsed once when each episode was created
+        sorted_episodes = sorted(episodes, key=episode_date_key)
         return sorted_episodes
 
     def get_number_of_podcasts(self) -> int:
@@ -101,11 +134,23 @@ class MemoryRepository(AbstractRepository):
 
     # Methods possibly used in next phases?
 
+    def __username_key(self, username: str) -> str:
+        username = username.strip()
+        return username.casefold() if self.__case_insensitive_usernames else username
+
     def add_user(self, user: User):
         self.__users.append(user)
+        # Like the linear search these indexes replace, the first user added under a name or id wins
+        self.__users_by_name.setdefault(self.__username_key(user.username), user)
+        self.__users_by_id.setdefault(user.id, user)
 
     def get_user(self, username: str) -> User:
-        return next((user for user in self.__users if user.username == username), None)
+        if not isinstance(username, str):
+            return None
+        return self.__users_by_name.get(self.__username_key(username))
+
+    def get_user_by_id(self, user_id: int) -> User:
+        return self.__users_by_id.get(user_id)
 
     def add_author(self, author: Author):
         self.__authors.add(author)
@@ -117,53 +162,90 @@ class MemoryRepository(AbstractRepository):
         return category_name
 
     def add_review(self, review: Review):
-        self.__reviews.append(review)
-        try:
-            self.__podcasts_index[review.podcast.id].add_review(review)
-        except KeyError:
-            pass
+        with self.__reviews_lock:
+            self.__reviews.append(review)
+            self.__last_review_id = max(self.__last_review_id, review.id)
+            podcast_id = review.podcast.id
+            self.__reviews_by_podcast.setdefault(podcast_id, []).append(review)
+            totals = self.__rating_totals.setdefault(podcast_id, [0, 0])
+            totals[0] += 1
+            totals[1] += review.rating
+            try:
+                self.__podcasts_index[review.podcast.id].add_review(review)
+            except KeyError:
+                pass
+
+    def create_review(self, user: User, podcast: Podcast, rating: int, comment: str) -> Review:
+        with self.__reviews_lock:
+            review = Review(self.__last_review_id + 1, user, podcast, rating, comment)
+            review.time_to_current_timestamp()
+            self.add_review(review)
+        return review
 
     def get_review(self, review_name) -> Review:
         return review_name
 
+    def __store_playlist(self, playlist: Playlist):
+        # Keeps both dicts in step, including when a playlist id is reused for another user
+        replaced = self.__playlists.get(playlist.id)
+        if replaced is not None and self.__playlists_index.get(replaced.user.id) is replaced:
+            del self.__playlists_index[replaced.user.id]
+        self.__playlists[playlist.id] = playlist
+        self.__playlists_index[playlist.user.id] = playlist
+
     def add_playlist(self, playlist: Playlist):
-        insort_left(self.__playlists, playlist)
-        self.__playlists_index[playlist.user] = playlist
+        self.__store_playlist(playlist)
 
     def get_playlists(self) -> List[Playlist]:
-        return self.__playlists
-
-    def search_podcast_by_author(self, author_name: str) -> List[Podcast]:
-        return [podcast for podcast in self.__podcasts if author_name.lower() in podcast.author.name.lower()]
-
-    def search_podcast_by_category(self, category_name: str) -> List[Podcast]:
-        return list({podcast.title: podcast for podcast in self.__podcasts for category in podcast.categories
-                     if category_name.lower() in category.name.lower()}.values())
+        return sorted(self.__playlists.values())
 
-    def search_podcast_by_title(self, title_string: str) -> List[Podcast]:
-        return [podcast for podcast in self.__podcasts if title_string.lower() in podcast.title.lower()]
+    def search_podcasts(self, query: str, field: str = None, offset: int = 0, limit: int = None,
+                        order: str = 'relevance') -> SearchPage:
+        fields = None if field is None else [field]
+        return SearchPage(*self.__search_index.search_page(query, offset, limit, fields, order))
 
-    def search_podcast_by_language(self, language_string: str) -> List[Podcast]:
-        return [podcast for podcast in self.__podcasts if language_string.lower() in podcast.language.lower()]
+    def search_episodes(self, query: str, offset: int = 0, limit: int = None, order: str = 'relevance') -> SearchPage:
+        return SearchPage(*self.__episode_search_index.search_page(query, offset, limit, order=order))
 
     #PHASE 2
     def get_playlist_by_user(self, user: User):
-        for playlist in self.__playlists:
-            if playlist.user == user:
-                return playlist
-        return None
+        if user is None:
+            return None
+        return self.__playlists_index.get(user.id)
 
     def get_number_of_episodes(self) -> int:
         return len(self.__episodes)
 
-    def update_users_playlist(self, playlist: Playlist):
-        self.__playlists_index[playlist.user] = playlist
+    def get_playlist_page(self, playlist: Playlist, offset: int, limit: int) -> PlaylistPage:
+        entries = []
+        for episode in playlist.episodes_page(offset, limit):
+            podcast = self.__podcasts_index.get(episode.pod_id)
+            entries.append(PlaylistEntry(episode, episode.pod_id, podcast.title if podcast else None,
+                                         podcast.image if podcast else None))
+        return PlaylistPage(entries, playlist.number_of_episodes)
+
+    def add_episodes_to_playlist(self, playlist: Playlist, episodes: Iterable[Episode]) -> int:
+        # The stored playlist is the same object, so changing it is all there is to do
+        return len(playlist.add_episodes(episodes))
+
+    def remove_episodes_from_playlist(self, playlist: Playlist, episodes: Iterable[Episode]) -> int:
+        return len(playlist.remove_episodes(episodes))
+
+    def add_podcast_episodes_to_playlist(self, playlist: Playlist, podcast_id: int) -> int:
+        return self.add_episodes_to_playlist(playlist, self.__episodes_by_podcast.get(podcast_id, []))
+
+    def remove_podcast_episodes_from_playlist(self, playlist: Playlist, podcast_id: int) -> int:
+        return self.remove_episodes_from_playlist(playlist, self.__episodes_by_podcast.get(podcast_id, []))
 
     def get_reviews(self) -> List[Review]:
         return self.__reviews
 
     def get_reviews_for_podcast(self, podcast_id: int) -> List[Review]:
-        return [review for review in self.__reviews if review.podcast.id == podcast_id]
+        return list(self.__reviews_by_podcast.get(podcast_id, []))
+
+    def get_rating_summary(self, podcast_id: int) -> RatingSummary:
+        count, rating_sum = self.__rating_totals.get(podcast_id, (0, 0))
+        return RatingSummary(count, rating_sum / count if count else 0)
 
     def add_multiple_categories(self, categories: set[Category]):
         for category in categories:
@@ -173,21 +255,17 @@ class MemoryRepository(AbstractRepository):
         pass
 
     def get_number_of_episodes_for_podcast(self, podcast_id: int) -> int:
-        pass
+        return len(self.__episodes_by_podcast.get(podcast_id, []))
 
     def get_episodes_for_podcast(self, podcast_id: int) -> List[Episode]:
-        podcast = self.get_podcast(podcast_id)
-        if podcast is None:
-            return []
-
-        episodes = [episode for episode in self.__episodes if episode.pod_id == podcast_id]
-        return episodes
+        # A copy, so callers cannot reorder the index
+        return list(self.__episodes_by_podcast.get(podcast_id, []))
 
     def get_episodes(self) -> List[Episode]:
         pass
 
-    def add_multiple_episodes(self, episode: List[Episode]):
-        pass
+    def add_multiple_episodes(self, episodes: List[Episode]):
+        self.add_episodes(episodes)
 
     def add_multiple_podcasts(self, podcast: List[Podcast]):
         pass
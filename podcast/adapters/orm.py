@@ -1,9 +1,13 @@
 from sqlalchemy import (
-    Table, Column, Integer, Float, String, DateTime, ForeignKey, Text
+    Table, Column, Integer, Float, String, DateTime, ForeignKey, Text, Index, DDL, bindparam, event, inspect, select,
+    text, update
 )
 from sqlalchemy.orm import registry, relationship
+from sqlalchemy.orm.collections import attribute_keyed_dict
 from datetime import datetime
-from podcast.domainmodel.model import Podcast, Author, Category, User, Review, Episode, Playlist
+from podcast.adapters.search_index import FIELD_WEIGHTS, EPISODE_FIELD_WEIGHTS, strip_html
+from podcast.domainmodel.model import (Podcast, Author, Category, User, Review, Episode, Playlist, parse_pub_timestamp,
+                                      title_sort_key)
 
 # Global variable giving access to the MetaData (schema) information of the database
 mapper_registry = registry()
@@ -23,8 +27,12 @@ podcast_table = Table(
     Column('description', String(255), nullable=True),
     Column('language', String(255), nullable=True),
     Column('website_url', String(255), nullable=True),
-    Column('author_id', ForeignKey('authors.author_id')),
-    Column('itunes_id', Integer, nullable=True)
+    Column('author_id', ForeignKey('authors.author_id'), index=True),
+    Column('itunes_id', Integer, nullable=True),
+    # title_sort_key(title), so the catalogue can be read in alphabetical order straight from an index
+    Column('sort_key', Text, nullable=False, default='', server_default=''),
+    # The catalogue's order, with the id breaking ties between equal titles, for keyset pagination
+    Index('ix_podcasts_sort_key_podcast_id', 'sort_key', 'podcast_id'),
 )
 # Episodes should have links to its podcast through its foreign keys
 episode_table = Table(
@@ -36,7 +44,13 @@ episode_table = Table(
     Column('episode_length', Integer, nullable=True),
     Column('description', String(255), nullable=True),
     Column('pub_date', Text, nullable=True),
-
+    # pub_date as seconds since the epoch, so episodes can be ordered by date in SQL
+    Column('pub_timestamp', Integer, nullable=False, default=0, server_default='0'),
+    # title_sort_key(title), so episode search results can be ordered by title as in memory
+    Column('sort_key', Text, nullable=False, default='', server_default=''),
+    # Serves both the lookup of a podcast's episodes and their ordering by date
+    Index('ix_episodes_podcast_id_pub_timestamp', 'podcast_id', 'pub_timestamp'),
+    Index('ix_episodes_sort_key_episode_id', 'sort_key', 'episode_id'),
 )
 
 categories_table = Table(
@@ -49,8 +63,8 @@ categories_table = Table(
 podcast_categories_table = Table(
     'podcast_categories', mapper_registry.metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
-    Column('podcast_id', ForeignKey('podcasts.podcast_id')),
-    Column('category_id', ForeignKey('categories.category_id'))
+    Column('podcast_id', ForeignKey('podcasts.podcast_id'), index=True),
+    Column('category_id', ForeignKey('categories.category_id'), index=True)
 )
 
 # Resolve definition for User table and the necessary code that maps the table to its domain model class
@@ -68,26 +82,124 @@ reviews_table = Table(
     Column('review_id', Integer, primary_key=True, autoincrement=True),
     Column('review_text', String(1024), nullable=False),
     Column('rating', Integer, nullable=False),  # rate
-    Column('podcast_id', ForeignKey('podcasts.podcast_id')),  # link Podcast table
-    Column('user_id', ForeignKey('users.user_id')),  # link User table
+    Column('podcast_id', ForeignKey('podcasts.podcast_id'), index=True),  # link Podcast table
+    Column('user_id', ForeignKey('users.user_id'), index=True),  # link User table
     Column('timestamp', DateTime, default=datetime.today())
 )
 
 playlists_table = Table(
     'playlists', mapper_registry.metadata,
     Column('playlist_id', Integer, primary_key=True, autoincrement=True),
-    Column('user_id', ForeignKey('users.user_id'), nullable=False),
+    Column('user_id', ForeignKey('users.user_id'), nullable=False, index=True),
     Column('playlist_title', Text, nullable=True)
 )
 
 playlists_episodes_table = Table(
     'playlist_episodes', mapper_registry.metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
-    Column('playlist_id', ForeignKey('playlists.playlist_id')),
-    Column('episode_id', ForeignKey('episodes.episode_id'))
+    Column('playlist_id', ForeignKey('playlists.playlist_id'), index=True),
+    Column('episode_id', ForeignKey('episodes.episode_id'), index=True)
 )
 
 
+def full_text_table(name: str, columns: list) -> DDL:
+    """ Declares an SQLite FTS5 virtual table with the given columns, created and dropped with the other tables.
+    Returns its CREATE statement, for upgrade_schema. """
+    create = DDL(f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5("
+                 f"{', '.join(columns)}, tokenize='unicode61 remove_diacritics 2')")
+    event.listen(mapper_registry.metadata, 'after_create', create.execute_if(dialect='sqlite'))
+    event.listen(mapper_registry.metadata, 'before_drop', DDL(f'DROP TABLE IF EXISTS {name}').execute_if(dialect='sqlite'))
+    return create
+
+
+def insert_search_row_statement(name: str, columns: list):
+    return text(f"INSERT INTO {name} (rowid, {', '.join(columns)}) "
+                f"VALUES (:rowid, {', '.join(':' + column for column in columns)})")
+
+
+def delete_search_row_statement(name: str):
+    return text(f"DELETE FROM {name} WHERE rowid = :rowid")
+
+
+def search_row(row_id: int, fields: dict, columns: list) -> dict:
+    """ Parameters for an insert_search_row_statement, with the HTML stripped from every field. """
+    row = {column: strip_html(fields.get(column)) for column in columns}
+    row['rowid'] = row_id
+    return row
+
+
+# Full-text indexes over the searchable podcast and episode fields, one row per podcast or episode with its id as
+# the rowid. Their columns follow FIELD_WEIGHTS and EPISODE_FIELD_WEIGHTS, which also give their bm25 weights.
+# The repository keeps them up to date.
+PODCAST_SEARCH_TABLE = 'podcasts_fts'
+PODCAST_SEARCH_COLUMNS = list(FIELD_WEIGHTS)
+create_podcast_search_table = full_text_table(PODCAST_SEARCH_TABLE, PODCAST_SEARCH_COLUMNS)
+insert_podcast_search_row = insert_search_row_statement(PODCAST_SEARCH_TABLE, PODCAST_SEARCH_COLUMNS)
+delete_podcast_search_row = delete_search_row_statement(PODCAST_SEARCH_TABLE)
+
+EPISODE_SEARCH_TABLE = 'episodes_fts'
+EPISODE_SEARCH_COLUMNS = list(EPISODE_FIELD_WEIGHTS)
+create_episode_search_table = full_text_table(EPISODE_SEARCH_TABLE, EPISODE_SEARCH_COLUMNS)
+insert_episode_search_row = insert_search_row_statement(EPISODE_SEARCH_TABLE, EPISODE_SEARCH_COLUMNS)
+delete_episode_search_row = delete_search_row_statement(EPISODE_SEARCH_TABLE)
+
+
+def upgrade_schema(engine):
+    """ Brings an existing database up to date with the metadata without repopulating it.
+    create_all() only creates missing tables, so columns and indexes added to existing tables are created here. """
+    # Inspect before opening the transaction: on a single shared connection, the inspector returning its
+    # connection to the pool would roll the transaction back
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+    existing_columns = {column['name'] for column in inspector.get_columns('episodes')}
+    existing_podcast_columns = {column['name'] for column in inspector.get_columns('podcasts')}
+    with engine.begin() as connection:
+        if 'pub_timestamp' not in existing_columns:
+            connection.execute(text('ALTER TABLE episodes ADD COLUMN pub_timestamp INTEGER NOT NULL DEFAULT 0'))
+            rows = connection.execute(select(episode_table.c.episode_id, episode_table.c.pub_date)).all()
+            if rows:
+                connection.execute(
+                    update(episode_table).where(episode_table.c.episode_id == bindparam('id')),
+                    [{'id': episode_id, 'pub_timestamp': parse_pub_timestamp(pub_date)} for episode_id, pub_date in rows])
+
+        for table, key, table_columns in ((podcast_table, 'podcast_id', existing_podcast_columns),
+                                          (episode_table, 'episode_id', existing_columns)):
+            if 'sort_key' not in table_columns:
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN sort_key TEXT NOT NULL DEFAULT ''"))
+                rows = connection.execute(select(table.c[key], table.c.title)).all()
+                if rows:
+                    connection.execute(
+                        update(table).where(table.c[key] == bindparam('id')),
+                        [{'id': row_id, 'sort_key': title_sort_key(title)} for row_id, title in rows])
+
+        if engine.dialect.name == 'sqlite' and PODCAST_SEARCH_TABLE not in existing_tables:
+            connection.execute(create_podcast_search_table)
+            rows = connection.execute(text(
+                "SELECT podcasts.podcast_id, podcasts.title, authors.name, "
+                "(SELECT group_concat(categories.category_name, ' ') FROM podcast_categories "
+                "JOIN categories ON categories.category_id = podcast_categories.category_id "
+                "WHERE podcast_categories.podcast_id = podcasts.podcast_id), "
+                "podcasts.language, podcasts.description "
+                "FROM podcasts LEFT JOIN authors ON authors.author_id = podcasts.author_id")).all()
+            if rows:
+                connection.execute(insert_podcast_search_row, [
+                    search_row(podcast_id, {'title': title, 'author': author, 'category': category,
+                                            'language': language, 'description': description}, PODCAST_SEARCH_COLUMNS)
+                    for podcast_id, title, author, category, language, description in rows])
+
+        if engine.dialect.name == 'sqlite' and EPISODE_SEARCH_TABLE not in existing_tables:
+            connection.execute(create_episode_search_table)
+            rows = connection.execute(select(
+                episode_table.c.episode_id, episode_table.c.title, episode_table.c.description)).all()
+            if rows:
+                connection.execute(insert_episode_search_row, [
+                    search_row(episode_id, {'title': title, 'description': description}, EPISODE_SEARCH_COLUMNS)
+                    for episode_id, title, description in rows])
+    for table in mapper_registry.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
 def map_model_to_tables():
     # Author
     mapper_registry.map_imperatively(Author, authors_table, properties={
@@ -108,6 +220,7 @@ def map_model_to_tables():
         '_language': podcast_table.c.language,
         '_website': podcast_table.c.website_url,
         '_itunes_id': podcast_table.c.itunes_id,
+        '_sort_key': podcast_table.c.sort_key,
         '_author': relationship(Author),
         'Podcast_episodes': relationship(Episode),
         'categories': relationship(Category, secondary=podcast_categories_table),
@@ -122,6 +235,8 @@ def map_model_to_tables():
         '_length': episode_table.c.episode_length,
         '_description': episode_table.c.description,
         '_pub_date': episode_table.c.pub_date,
+        '_pub_timestamp': episode_table.c.pub_timestamp,
+        '_sort_key': episode_table.c.sort_key,
     })
 
     # User
@@ -145,5 +260,8 @@ def map_model_to_tables():
         '_id': playlists_table.c.playlist_id,
         '_user': relationship(User),
         '_title': playlists_table.c.playlist_title,
-        '_episodes': relationship(Episode, secondary=playlists_episodes_table),
+        # Keyed by episode id like Playlist._episodes, and loaded in the order the episodes were added
+        '_episodes': relationship(Episode, secondary=playlists_episodes_table,
+                                  collection_class=attribute_keyed_dict('_id'),
+                                  order_by=playlists_episodes_table.c.id),
     })
@@ -1,5 +1,5 @@
 import abc
-from typing import List
+from typing import Iterable, List, NamedTuple
 
 from podcast.domainmodel.model import Author, Podcast, Category, User, Episode, Review, Playlist
 
@@ -11,6 +11,32 @@ class RepositoryException(Exception):
         print(f'RepositoryException: {message}')
 
 
+class RatingSummary(NamedTuple):
+    """ Number of reviews of a podcast and their average rating (0 when there are no reviews). """
+    count: int
+    average: float
+
+
+class PlaylistEntry(NamedTuple):
+    """ An episode in a playlist, with the title and image of its podcast. """
+    episode: Episode
+    podcast_id: int
+    podcast_title: str
+    podcast_image: str
+
+
+class PlaylistPage(NamedTuple):
+    """ One page of a playlist, in the order the episodes were added, and the number of episodes in the playlist. """
+    entries: List[PlaylistEntry]
+    total: int
+
+
+class SearchPage(NamedTuple):
+    """ One page of search results, most relevant first, and the number of results across all pages. """
+    results: list
+    total: int
+
+
 class AbstractRepository(abc.ABC):
 
     # region Author_data
@@ -72,8 +98,9 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def add_multiple_episodes(self, episode: List[Episode]):
-        """ Add multiple episodes to the repository of episode. """
+    def add_multiple_episodes(self, episodes: Iterable[Episode]):
+        """ Add multiple episodes to the repository of episode.
+        Population calls this once per chunk yielded by CSVDataReader.iter_episodes. """
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -88,7 +115,7 @@ class AbstractRepository(abc.ABC):
 
     @abc.abstractmethod
     def get_episodes_for_podcast(self, podcast_id: int) -> List[Episode]:
-        """Get all episodes for a specific podcast by podcast_id."""
+        """Get all episodes for a specific podcast by podcast_id, ordered by publication date (oldest first). """
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -122,47 +149,43 @@ class AbstractRepository(abc.ABC):
     # endregion
 
     @abc.abstractmethod
-    def search_podcast_by_title(self, title_string: str) -> List[Podcast]:
-        """Search for the podcast whose title includes the parameter title_string.
-        It searches for the podcast title in case-insensitive and without trailing space.
-        For example, the title 'Empire' will be searched if the title_string is 'empir'. """
+    def search_podcasts(self, query: str, field: str = None, offset: int = 0, limit: int = None,
+                        order: str = 'relevance') -> SearchPage:
+        """ Full-text search of the podcasts.
+        Every word of the query must match a word, or the start of a word, in the given field ('title', 'author',
+        'category', 'language' or 'description'), or in any of them when field is None. Returns up to limit podcasts
+        (all of them when limit is None) starting at offset, in the given order ('relevance', best match first, or
+        'title'), and the total number of matching podcasts. """
         raise NotImplementedError
 
     @abc.abstractmethod
-    def search_podcast_by_author(self, author_name: str) -> List[Podcast]:
-        """Search for the podcast whose author contains the input author_name string.
-        It searches for author names in case-insensitive and without trailing spaces.
-        Returns searched podcast as a list
-        """
+    def search_episodes(self, query: str, offset: int = 0, limit: int = None, order: str = 'relevance') -> SearchPage:
+        """ Full-text search of episode titles and descriptions, matching query words and paging and ordering the
+        results the same way as search_podcasts. """
         raise NotImplementedError
 
+    # stuff from mem_repo
     @abc.abstractmethod
-    def search_podcast_by_category(self, category_string: str) -> List[Podcast]:
-        """Search for the podcast whose categories contain the input category_string.
-        If any of the podcast's categories contain the substring category_string, that podcast should be selected for the search.
-        It searches for category names in case-insensitive and without trailing spaces.
-        Returns searched podcast as a list
-        """
+    def set_podcasts(self, podcasts: List[Podcast]):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def search_podcast_by_language(self, language_string: str) -> List[Podcast]:
-        """Search for list of podcasts that match given language
-        Returns searched podcast as a list
-        """
+    def get_list_of_podcasts_titles(self) -> List[str]:
         raise NotImplementedError
 
-    # stuff from mem_repo
     @abc.abstractmethod
-    def set_podcasts(self, podcasts: List[Podcast]):
+    def get_podcasts_by_alphabet(self, list_of_names):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_list_of_podcasts_titles(self) -> List[str]:
+    def get_catalogue_page(self, offset: int, limit: int) -> List[Podcast]:
+        """ Returns up to limit podcasts starting at offset in the catalogue's alphabetical order (title_sort_key,
+        then id). """
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_podcasts_by_alphabet(self, list_of_names):
+    def get_catalogue_page_count(self, page_size: int) -> int:
+        """ Returns the number of pages of page_size podcasts in the catalogue. """
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -178,7 +201,30 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def update_users_playlist(self, playlist: Playlist):
+    def get_playlist_page(self, playlist: Playlist, offset: int, limit: int) -> PlaylistPage:
+        """ Returns up to limit of the playlist's episodes starting at offset, each with its podcast's title and
+        image, and the number of episodes in the playlist. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def add_episodes_to_playlist(self, playlist: Playlist, episodes: Iterable[Episode]) -> int:
+        """ Adds the episodes that are not already in the stored playlist, in order, writing only those.
+        Returns the number of episodes added. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def remove_episodes_from_playlist(self, playlist: Playlist, episodes: Iterable[Episode]) -> int:
+        """ Removes the episodes from the stored playlist, writing only those. Returns the number removed. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def add_podcast_episodes_to_playlist(self, playlist: Playlist, podcast_id: int) -> int:
+        """ Adds every episode of the podcast not already in the playlist, oldest first. Returns the number added. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def remove_podcast_episodes_from_playlist(self, playlist: Playlist, podcast_id: int) -> int:
+        """ Removes every episode of the podcast from the playlist. Returns the number removed. """
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -189,6 +235,11 @@ class AbstractRepository(abc.ABC):
     def get_reviews_for_podcast(self, podcast_id: int) -> List[Review]:
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_rating_summary(self, podcast_id: int) -> RatingSummary:
+        """ Returns the review count and average rating of a podcast without loading its reviews. """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_random_podcasts(self) -> List[Podcast]:
         raise NotImplementedError
@@ -203,6 +254,11 @@ class AbstractRepository(abc.ABC):
     def get_user(self, username):
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_user_by_id(self, user_id: int) -> User:
+        """ Returns the user with the given id, or None if there is no such user. """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_playlist_by_user(self, user: User):
         raise NotImplementedError
@@ -215,6 +271,12 @@ class AbstractRepository(abc.ABC):
     def add_review(self, review: Review):
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def create_review(self, user: User, podcast: Podcast, rating: int, comment: str) -> Review:
+        """ Adds a new review timestamped now, with a fresh id allocated by the repository, and returns it.
+        Safe to call from concurrent requests. """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_episodes_by_date(self, episodes: List[Episode]) -> List[Episode]:
         raise NotImplementedError
@@ -1,37 +1,58 @@
 import os
 import csv
+import warnings
 from pathlib2 import Path
 from podcast.adapters.repository import AbstractRepository
 from podcast.adapters.datareader.csvdatareader import CSVDataReader
+from podcast.adapters.snapshot import Catalogue, load_snapshot, save_snapshot
 
+# Number of episodes read from episodes.csv and written to the database at a time
+EPISODE_CHUNK_SIZE = 1000
 
-def populate(data_path: Path, repo: AbstractRepository, database_mode: bool):
+
+def read_catalogue(reader: CSVDataReader) -> Catalogue:
+    reader.read_podcasts()
+    reader.read_episodes()
+    return Catalogue(reader.dataset_of_podcasts, reader.dataset_of_episodes,
+                     reader.dataset_of_authors, reader.dataset_of_categories)
+
+
+def populate(data_path: Path, repo: AbstractRepository, database_mode: bool, snapshot_path: str = None):
     episode_path = os.path.join(data_path, "data/episodes.csv")
     podcast_path = os.path.join(data_path, "data/podcasts.csv")
 
     reader = CSVDataReader(episode_path, podcast_path)
 
-    reader.read_podcasts()
-    reader.read_episodes()
-    authors = reader.dataset_of_authors
-    podcasts = reader.dataset_of_podcasts
-    categories = reader.dataset_of_categories
-    episodes = reader.dataset_of_episodes
-
     if database_mode:
+        reader.read_podcasts()
+
         # Add authors to the repo
-        repo.add_multiple_authors(authors)
+        repo.add_multiple_authors(reader.dataset_of_authors)
 
         # Add categories to the repo
-        repo.add_multiple_categories(categories)
+        repo.add_multiple_categories(reader.dataset_of_categories)
 
         # # Add podcasts to the repo
-        repo.add_multiple_podcasts(podcasts)
+        repo.add_multiple_podcasts(reader.dataset_of_podcasts)
 
-        # Add episodes to the repo
-        repo.add_multiple_episodes(episodes)
+        # Stream episodes into the repo chunk by chunk so the whole file is never held in memory
+        for episodes in reader.iter_episodes(EPISODE_CHUNK_SIZE):
+            repo.add_multiple_episodes(episodes)
     else:
-        repo.set_podcasts(podcasts)
-        repo.add_episodes(episodes)
-        repo.add_multiple_authors(authors)
-        repo.add_multiple_categories(categories)
\ No newline at end of file
+        # Load the parsed catalogue from the snapshot when the CSV files have not changed since it was written,
+        # otherwise parse the CSV files and refresh the snapshot
+        catalogue = None
+        if snapshot_path:
+            catalogue = load_snapshot(snapshot_path, [podcast_path, episode_path])
+        if catalogue is None:
+            catalogue = read_catalogue(reader)
+            if snapshot_path:
+                try:
+                    save_snapshot(snapshot_path, [podcast_path, episode_path], catalogue)
+                except OSError as e:
+                    warnings.warn(f'Could not write catalogue snapshot {snapshot_path}: {e}', RuntimeWarning)
+
+        repo.set_podcasts(catalogue.podcasts)
+        repo.add_episodes(catalogue.episodes)
+        repo.add_multiple_authors(catalogue.authors)
+        repo.add_multiple_categories(catalogue.categories)
@@ -0,0 +1,385 @@
+import heapq
+import html
+import math
+import operator
+import re
+import threading
+from bisect import bisect_left, insort_left
+from typing import Callable, Collection, Dict, Iterable, List, Optional, Tuple
+
+from podcast.domainmodel.model import Episode, Podcast
+
+TOKEN_PATTERN = re.compile(r'\w+')
+TAG_PATTERN = re.compile(r'<[^>]*>')
+
+# Searchable fields and how much a match in each one counts towards a podcast's relevance
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'author': 2.0,
+    'category': 2.0,
+    'language': 1.0,
+    'description': 1.0,
+}
+
+# The same for episodes
+EPISODE_FIELD_WEIGHTS = {
+    'title': 3.0,
+    'description': 1.0,
+}
+
+
+# Orders that search results can be returned in: best match first, or by title
+SEARCH_ORDERS = ('relevance', 'title')
+
+# Query words shorter than this only match whole words; longer ones also match the words they start
+MIN_PREFIX_LENGTH = 3
+
+# A query word matches at most this many words: itself, if it is a word, and the most common words it starts
+MAX_PREFIX_EXPANSIONS = 16
+
+# Up to this many matches (or four times the requested results) every match is scored; beyond it the top results
+# are found without scoring them all
+TOP_K_MIN_MATCHES = 256
+
+# Entries kept in each of the prefix expansion and posting order caches
+RANKING_CACHE_SIZE = 1024
+
+
+def strip_html(text: str) -> str:
+    """ Replaces HTML tags with spaces and decodes entities, leaving the readable text. """
+    if not text:
+        return ''
+    return html.unescape(TAG_PATTERN.sub(' ', text))
+
+
+def tokenize(text: str) -> List[str]:
+    """ Splits text into case-folded words, ignoring any HTML markup. """
+    return TOKEN_PATTERN.findall(strip_html(text).casefold())
+
+
+def podcast_fields(podcast: Podcast) -> Dict[str, str]:
+    return {
+        'title': podcast.title,
+        'author': podcast.author.name if podcast.author is not None else '',
+        'category': ' '.join(category.name for category in podcast.categories),
+        'language': podcast.language,
+        'description': podcast.description,
+    }
+
+
+def episode_fields(episode: Episode) -> Dict[str, str]:
+    return {
+        'title': episode.title,
+        'description': episode.description,
+    }
+
+
+class SearchIndex:
+    """ Inverted index from words to the items (anything with an id and a sort_key) containing them, per field.
+
+    Every query word has to match (as a word or, from MIN_PREFIX_LENGTH characters, the start of one) for an item
+    to be returned, and results are ranked by a tf-idf score weighted by field_weights. Text is tokenized, and its
+    HTML stripped, once when an item is indexed; only the postings are kept. Items given to add_all are indexed when
+    the index is first used, so loading a catalogue does not pay for indexing it. """
+
+    def __init__(self, field_weights: Dict[str, float], fields_of: Callable[[object], Dict[str, str]]):
+        self.__field_weights = field_weights
+        self.__fields_of = fields_of
+        # field -> word -> {item id: number of occurrences}
+        self.__postings = {field: dict() for field in field_weights}
+        # field -> sorted list of the words in the field, for prefix matching (None until next needed)
+        self.__vocabulary = {field: [] for field in field_weights}
+        # item id -> field -> words, so an item can be re-indexed or removed
+        self.__indexed = dict()
+        self.__items = dict()
+        # item id -> (sort key, item id), and every item in that order for title searches (None until next needed)
+        self.__title_keys = dict()
+        self.__title_order = None
+        # (field, query word) -> the words it matches, and (field, word) -> the ids in its posting, most occurrences
+        # first; both are emptied whenever an item is added or removed
+        self.__expansions = dict()
+        self.__posting_orders = dict()
+        # Items from add_all not indexed yet, and the lock that makes sure only one thread indexes them
+        self.__pending = []
+        self.__pending_lock = threading.Lock()
+
+    def __len__(self):
+        self.__index_pending()
+        return len(self.__items)
+
+    def __index_pending(self):
+        if not self.__pending:
+            return
+        with self.__pending_lock:
+            if not self.__pending:
+                return
+            # Sort the vocabulary and titles once when next needed instead of inserting each item in order
+            self.__vocabulary = {field: None for field in self.__field_weights}
+            self.__title_order = None
+            for item in self.__pending:
+                self.__add(item)
+            self.__pending = []
+
+    def add(self, item):
+        """ Indexes the item, replacing any earlier version with the same id. """
+        self.__index_pending()
+        self.__add(item)
+
+    def __add(self, item):
+        self.__remove(item.id)
+        self.__expansions.clear()
+        self.__posting_orders.clear()
+        words_by_field = {}
+        for field, text in self.__fields_of(item).items():
+            words = tokenize(text)
+            words_by_field[field] = set(words)
+            postings = self.__postings[field]
+            for word in words:
+                item_counts = postings.get(word)
+                if item_counts is None:
+                    item_counts = postings[word] = dict()
+                    if self.__vocabulary[field] is not None:
+                        insort_left(self.__vocabulary[field], word)
+                item_counts[item.id] = item_counts.get(item.id, 0) + 1
+        self.__indexed[item.id] = words_by_field
+        self.__items[item.id] = item
+        title_key = self.__title_keys[item.id] = (item.sort_key, item.id)
+        if self.__title_order is not None:
+            insort_left(self.__title_order, title_key)
+
+    def add_all(self, items: Iterable):
+        """ Queues the items to be indexed, replacing any earlier versions, when the index is next used. """
+        self.__pending.extend(items)
+
+    def remove(self, item_id: int):
+        self.__index_pending()
+        self.__remove(item_id)
+
+    def __remove(self, item_id: int):
+        words_by_field = self.__indexed.pop(item_id, None)
+        if words_by_field is None:
+            return
+        self.__expansions.clear()
+        self.__posting_orders.clear()
+        del self.__items[item_id]
+        title_key = self.__title_keys.pop(item_id)
+        if self.__title_order is not None:
+            del self.__title_order[bisect_left(self.__title_order, title_key)]
+        for field, words in words_by_field.items():
+            postings = self.__postings[field]
+            for word in words:
+                item_counts = postings[word]
+                del item_counts[item_id]
+                if not item_counts:
+                    del postings[word]
+                    vocabulary = self.__vocabulary[field]
+                    if vocabulary is not None:
+                        del vocabulary[bisect_left(vocabulary, word)]
+
+    def __matching_words(self, field: str, query_word: str) -> List[str]:
+        postings = self.__postings[field]
+        if len(query_word) < MIN_PREFIX_LENGTH:
+            return [query_word] if query_word in postings else []
+        words = self.__expansions.get((field, query_word))
+        if words is None:
+            vocabulary = self.__vocabulary[field]
+            if vocabulary is None:
+                vocabulary = self.__vocabulary[field] = sorted(postings)
+            # Every word starting with the query word sorts before it followed by the last code point, which is not a
+            # word character
+            words = vocabulary[bisect_left(vocabulary, query_word):bisect_left(vocabulary, query_word + '\U0010ffff')]
+            if len(words) > MAX_PREFIX_EXPANSIONS:
+                exact = [query_word] if query_word in postings else []
+                words = exact + heapq.nlargest(MAX_PREFIX_EXPANSIONS - len(exact),
+                                               (word for word in words if word != query_word),
+                                               key=lambda word: len(postings[word]))
+            if len(self.__expansions) >= RANKING_CACHE_SIZE:
+                self.__expansions.clear()
+            self.__expansions[(field, query_word)] = words
+        return words
+
+    def __matches(self, query: str, fields: Optional[Iterable[str]]) -> List[List[tuple]]:
+        # For each distinct query word, the postings it matches as (field, word, weight, {item id: occurrences}),
+        # where the weight is the field's weight times the word's idf. Empty when any query word matches nothing.
+        field_weights = self.__field_weights
+        fields = list(field_weights) if fields is None else [field for field in fields if field in field_weights]
+        number_of_items = len(self.__items)
+        matches = []
+        for query_word in dict.fromkeys(tokenize(query)):
+            word_matches = []
+            for field in fields:
+                postings = self.__postings[field]
+                for word in self.__matching_words(field, query_word):
+                    item_counts = postings[word]
+                    idf = math.log(1 + number_of_items / len(item_counts))
+                    word_matches.append((field, word, field_weights[field] * idf, item_counts))
+            if not word_matches:
+                return []
+            matches.append(word_matches)
+        return matches
+
+    @staticmethod
+    def __candidates(matches: List[List[tuple]]) -> Collection[int]:
+        # The ids of the items matching every query word, intersected from the rarest word up. A word matching a
+        # single posting uses the posting itself rather than a copy of its ids.
+        item_sets = []
+        for word_matches in matches:
+            if len(word_matches) == 1:
+                item_sets.append(word_matches[0][3])
+            else:
+                item_sets.append(set().union(*(item_counts for *_, item_counts in word_matches)))
+        item_sets.sort(key=len)
+        candidates = item_sets[0]
+        for item_ids in item_sets[1:]:
+            if isinstance(candidates, set) and isinstance(item_ids, set):
+                candidates = candidates & item_ids
+            else:
+                candidates = {item_id for item_id in candidates if item_id in item_ids}
+            if not candidates:
+                break
+        return candidates
+
+    @staticmethod
+    def __score(postings: List[tuple], item_id: int) -> float:
+        score = 0.0
+        for field, word, weight, item_counts in postings:
+            count = item_counts.get(item_id)
+            if count:
+                score += weight * count
+        return score
+
+    def __posting_order(self, field: str, word: str) -> List[int]:
+        order = self.__posting_orders.get((field, word))
+        if order is None:
+            item_counts = self.__postings[field][word]
+            order = sorted(item_counts, key=lambda item_id: (-item_counts[item_id], item_id))
+            if len(self.__posting_orders) >= RANKING_CACHE_SIZE:
+                self.__posting_orders.clear()
+            self.__posting_orders[(field, word)] = order
+        return order
+
+    def __by_relevance(self, matches: List[List[tuple]], candidates: Collection[int],
+                       number: Optional[int]) -> List[int]:
+        # The ids of the first number (or all) of the candidates, best score first and then by id
+        postings = [posting for word_matches in matches for posting in word_matches]
+        if (number is None or len(matches) > 1 or len(postings) > len(self.__field_weights)
+                or len(candidates) <= max(TOP_K_MIN_MATCHES, 4 * number)):
+            # Score every candidate: also for a query of several words, as most items in their postings then miss one
+            # of the words, and for a word matching many postings, as the threshold below only falls once each of
+            # them has been read past its items with the most occurrences. Each posting or the candidates are walked,
+            # whichever is shorter, adding terms in posting order as __score does, so both ways give equal scores.
+            scores = dict.fromkeys(candidates, 0.0)
+            for field, word, weight, item_counts in postings:
+                if len(item_counts) < len(scores):
+                    for item_id, count in item_counts.items():
+                        if item_id in scores:
+                            scores[item_id] += weight * count
+                else:
+                    for item_id in scores:
+                        count = item_counts.get(item_id)
+                        if count:
+                            scores[item_id] += weight * count
+            ranked = zip(scores.values(), map(operator.neg, scores))
+            if number is None:
+                ranked = sorted(ranked, reverse=True)
+            else:
+                ranked = heapq.nlargest(number, ranked)
+            return [-negative_id for score, negative_id in ranked]
+
+        # Threshold algorithm: read the postings in step, each from its most occurrences down, scoring every item on
+        # first sight, until no unread item can make the top. An unread item scores at most the sum of each
+        # posting's next term, and only reaches it by sharing the next item's occurrences in every posting, where
+        # ties are in id order, so it cannot have an id below the largest next id.
+        orders = [self.__posting_order(field, word) for field, word, weight, item_counts in postings]
+        positions = [0] * len(postings)
+        seen = set()
+        top = []  # heap of (score, -item id), the worst of the best items so far first
+        while True:
+            for index, order in enumerate(orders):
+                position = positions[index]
+                if position == len(order):
+                    continue
+                item_id = order[position]
+                positions[index] = position + 1
+                if item_id in seen:
+                    continue
+                seen.add(item_id)
+                if item_id in candidates:
+                    entry = (self.__score(postings, item_id), -item_id)
+                    if len(top) < number:
+                        heapq.heappush(top, entry)
+                    elif entry > top[0]:
+                        heapq.heapreplace(top, entry)
+            threshold = 0.0
+            next_id = None
+            for (field, word, weight, item_counts), order, position in zip(postings, orders, positions):
+                if position < len(order):
+                    item_id = order[position]
+                    threshold += weight * item_counts[item_id]
+                    next_id = item_id if next_id is None else max(next_id, item_id)
+            if next_id is None:
+                break
+            if len(top) == number:
+                worst_score, worst_id = top[0][0], -top[0][1]
+                if threshold < worst_score or (threshold == worst_score and next_id >= worst_id):
+                    break
+        top.sort(reverse=True)
+        return [-negative_id for score, negative_id in top]
+
+    def __by_title(self, candidates: Collection[int], number: Optional[int]) -> List[int]:
+        # The ids of the first number (or all) of the candidates in title order
+        title_keys = self.__title_keys
+        if number is not None and number * len(title_keys) < len(candidates) ** 2:
+            # Matches are common enough that walking every title in order reaches the page sooner than ranking them
+            title_order = self.__title_order
+            if title_order is None:
+                title_order = self.__title_order = sorted(title_keys.values())
+            page = []
+            for sort_key, item_id in title_order:
+                if item_id in candidates:
+                    page.append(item_id)
+                    if len(page) == number:
+                        break
+            return page
+        if number is None:
+            return sorted(candidates, key=title_keys.__getitem__)
+        return heapq.nsmallest(number, candidates, key=title_keys.__getitem__)
+
+    def search(self, query: str, fields: Optional[Iterable[str]] = None) -> List:
+        """ Returns the items matching every word of the query in the given fields (all fields by default),
+        most relevant first. """
+        return self.search_page(query, fields=fields)[0]
+
+    def search_page(self, query: str, offset: int = 0, limit: Optional[int] = None,
+                    fields: Optional[Iterable[str]] = None, order: str = 'relevance') -> Tuple[List, int]:
+        """ Returns up to limit of the matching items in the given order (one of SEARCH_ORDERS), starting at
+        offset, along with the number of matching items. Only as many matches as the page needs are ranked. """
+        if order not in SEARCH_ORDERS:
+            raise ValueError(f"Unknown search order '{order}'.")
+        self.__index_pending()
+        matches = self.__matches(query, fields)
+        if not matches:
+            return [], 0
+        candidates = self.__candidates(matches)
+        if (limit is not None and limit <= 0) or not candidates:
+            return [], len(candidates)
+        number = None if limit is None else offset + limit
+        if order == 'relevance':
+            ranked = self.__by_relevance(matches, candidates, number)
+        else:
+            ranked = self.__by_title(candidates, number)
+        return [self.__items[item_id] for item_id in ranked[offset:]], len(candidates)
+
+
+class PodcastSearchIndex(SearchIndex):
+    """ Search index over the fields in FIELD_WEIGHTS of each podcast. """
+
+    def __init__(self):
+        super().__init__(FIELD_WEIGHTS, podcast_fields)
+
+
+class EpisodeSearchIndex(SearchIndex):
+    """ Search index over episode titles and descriptions. """
+
+    def __init__(self):
+        super().__init__(EPISODE_FIELD_WEIGHTS, episode_fields)
@@ -0,0 +1,97 @@
+import gc
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import List, NamedTuple, Optional
+
+from podcast.domainmodel.model import Author, Podcast, Category, Episode
+
+# Bump whenever the pickled domain model changes shape, so old snapshots are rebuilt instead of loaded.
+SNAPSHOT_VERSION = 4
+
+
+class Catalogue(NamedTuple):
+    podcasts: List[Podcast]
+    episodes: List[Episode]
+    authors: set[Author]
+    categories: set[Category]
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint_sources(source_paths: List[str]) -> List[dict]:
+    """ Describes each CSV source by absolute path, size, modification time and content hash. """
+    fingerprint = []
+    for path in source_paths:
+        stat = os.stat(path)
+        fingerprint.append({
+            'path': os.path.abspath(path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_digest(path),
+        })
+    return fingerprint
+
+
+def sources_unchanged(fingerprint: List[dict], source_paths: List[str]) -> bool:
+    """ Checks a stored fingerprint against the sources on disk.
+    Matching size and mtime is trusted as-is; otherwise the file is re-hashed, so a touched but unchanged file
+    does not force a rebuild. """
+    if len(fingerprint) != len(source_paths):
+        return False
+    for entry, path in zip(fingerprint, source_paths):
+        if entry['path'] != os.path.abspath(path):
+            return False
+        stat = os.stat(path)
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns != entry['mtime_ns'] and file_digest(path) != entry['sha256']:
+            return False
+    return True
+
+
+def load_snapshot(snapshot_path: str, source_paths: List[str]) -> Optional[Catalogue]:
+    """ Returns the catalogue stored at snapshot_path, or None if it is missing, unreadable, written by another
+    SNAPSHOT_VERSION or built from different CSV sources.
+    Snapshots are pickles, so only point this at files the application wrote itself. """
+    try:
+        with open(snapshot_path, 'rb') as snapshot_file:
+            header = pickle.load(snapshot_file)
+            if header.get('version') != SNAPSHOT_VERSION:
+                return None
+            if not sources_unchanged(header.get('sources', []), source_paths):
+                return None
+            # The catalogue is a large graph of small objects; the cyclic collector only slows unpickling down.
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                return pickle.load(snapshot_file)
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+    except Exception:
+        # A truncated or corrupt pickle can fail in almost any way (ValueError, IndexError, UnicodeDecodeError,
+        # MemoryError, ...); whatever the failure, the snapshot is treated as missing and the CSV files are read
+        return None
+
+
+def save_snapshot(snapshot_path: str, source_paths: List[str], catalogue: Catalogue):
+    """ Writes the catalogue atomically, so concurrently booting workers never read a half-written file. """
+    header = {'version': SNAPSHOT_VERSION, 'sources': fingerprint_sources(source_paths)}
+    directory = os.path.dirname(os.path.abspath(snapshot_path))
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as snapshot_file:
+            pickle.dump(header, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(catalogue, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, snapshot_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
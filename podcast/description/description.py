@@ -30,17 +30,17 @@ def show_description(podcast_id, counter=0, page=0):
 
     logged_in = True
 
-    playlist = []
+    playlist_ids = set()
     if session.get('user_name') is not None:
         username = session['user_name']
-        playlist = services.get_user_playlists(username, repo.repo_instance).list_of_episodes
-        playlist = services.episodes_to_dict(playlist)
+        # Just the ids, so the template checks each episode on the page against the playlist in constant time
+        playlist_ids = services.get_playlist_episode_ids(username, repo.repo_instance)
     else:
         logged_in = False
 
     # Reviews stuff
     average_rating = services.get_average_podcast_rating(podcast_id, repo.repo_instance)
-    podcast_to_show_reviews = len(podcast['reviews'])
+    podcast_to_show_reviews = average_rating['count']
 
     return render_template('podcastDescription.html',
                            podcast=podcast,
@@ -48,7 +48,7 @@ def show_description(podcast_id, counter=0, page=0):
                            total=total,
                            page=episode_page,
                            counter=counter,
-                           playlist=playlist,
+                           playlist_ids=playlist_ids,
                            logged_in=logged_in,
                            podcast_id=podcast_id,
                            podcast_to_show_reviews=podcast_to_show_reviews,
@@ -95,13 +95,7 @@ def add_podcast_to_playlist(podcast_id, counter=0, page=0):
 
     playlist = services.get_user_playlists(username, repo.repo_instance)
 
-    temp = []
-    for episode in playlist.list_of_episodes:
-        temp.append(episode)
-
-    services.add_all_episodes_to_playlist(playlist, podcast_id, repo.repo_instance)
-
-    if playlist.list_of_episodes != temp:
+    if services.add_all_episodes_to_playlist(playlist, podcast_id, repo.repo_instance):
         flash("All episodes in Podcast ADDED", 'add')
     return redirect(url_for('description_bp.show_description', podcast_id=podcast_id, counter=counter, page=page))
 
@@ -116,13 +110,7 @@ def remove_podcast_from_playlist(podcast_id, counter=0, page=0):
 
     playlist = services.get_user_playlists(username, repo.repo_instance)
 
-    temp = []
-    for episode in playlist.list_of_episodes:
-        temp.append(episode)
-
-    services.remove_all_episodes_from_playlist(playlist, podcast_id, repo.repo_instance)
-
-    if playlist.list_of_episodes != temp:
+    if services.remove_all_episodes_from_playlist(playlist, podcast_id, repo.repo_instance):
         flash("All episodes in Podcast REMOVED", 'remove')
     return redirect(url_for('description_bp.show_description', podcast_id=podcast_id, counter=counter, page=page))
 
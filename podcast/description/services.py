@@ -1,5 +1,4 @@
-from datetime import datetime
-from typing import List, Iterable
+from typing import List, Iterable, Set
 
 from podcast.adapters.repository import AbstractRepository
 from podcast.domainmodel.model import Podcast, Author, Episode, Category, Playlist, Review
@@ -32,29 +31,31 @@ def get_user_playlists(username: str, repo: AbstractRepository):
     return playlist
 
 
+def get_playlist_episode_ids(username: str, repo: AbstractRepository) -> Set[int]:
+    return get_user_playlists(username, repo).episode_ids
+
+
 def add_episode_to_playlist(playlist: Playlist, episode: Episode, repo: AbstractRepository):
-    playlist.add_episode(episode)
-    repo.update_users_playlist(playlist)
+    repo.add_episodes_to_playlist(playlist, [episode])
 
 
 def remove_episode_from_playlist(playlist: Playlist, episode: Episode, repo: AbstractRepository):
-    playlist.remove_episode(episode)
-    repo.update_users_playlist(playlist)
+    # An unknown episode id gives no episode, and there is nothing to remove
+    if episode is not None:
+        repo.remove_episodes_from_playlist(playlist, [episode])
 
 
 def get_episodes(podcast_id, repo: AbstractRepository):
-    podcast_episodes = repo.get_episodes_for_podcast(podcast_id)
-    sorted_episodes = sorted(podcast_episodes, key=lambda episode: datetime.strptime(episode.pub_date + '00',
-                                                                             '%Y-%m-%d %H:%M:%S%z'))
-    return sorted_episodes
+    # The repository returns the episodes already ordered by publication date
+    return repo.get_episodes_for_podcast(podcast_id)
 
 
 def get_podcast_by_id(podcast_id, repo: AbstractRepository):
-    podcasts = repo.get_podcasts_by_id()
-    podcasts = [podcast_to_dict(podcast) for podcast in podcasts]
-    if podcast_id > len(podcasts):
+    # Fetch only the requested podcast; ids are not guaranteed to be contiguous
+    podcast = repo.get_podcast(podcast_id)
+    if podcast is None:
         raise NonExistentPodcast
-    return podcasts[podcast_id - 1]
+    return podcast_to_dict(podcast)
 
 
 def episode_to_dict(episode: Episode):
@@ -121,18 +122,8 @@ def add_review_to_podcast(username: str, podcast_id: int, comment_text: str, rat
     if user is None:
         raise UnknownUserException
 
-    # Create a new review
-    review = Review(
-        review_id=len(repo.get_reviews()) + 1,  # Assuming you're generating review IDs sequentially
-        review_user=user,
-        review_podcast=podcast,
-        podcast_rating=rating,
-        review_content=comment_text
-    )
-
-    review.time_to_current_timestamp()
-    # Add review to repo and Add the review to the podcast
-    repo.add_review(review)
+    # The repository allocates the review id and timestamps the review
+    return repo.create_review(user, podcast, rating, comment_text)
 
 
 def retrieve_podcast_reviews(podcast_id, repo: AbstractRepository):
@@ -141,11 +132,13 @@ def retrieve_podcast_reviews(podcast_id, repo: AbstractRepository):
 
 
 def get_average_podcast_rating(podcast_id, repo: AbstractRepository):
-    podcast = repo.get_podcast(podcast_id)
-    avg_rating = podcast.average_rating()
+    # The repository keeps the count and average up to date, so the reviews are not summed on every page view
+    summary = repo.get_rating_summary(podcast_id)
+    avg_rating = summary.average
     avg = {
         'number': round(avg_rating, 1),
-        'stars': round(avg_rating) * "★" + (5 - round(avg_rating)) * "☆"
+        'stars': round(avg_rating) * "★" + (5 - round(avg_rating)) * "☆",
+        'count': summary.count
     }
     return avg
 
@@ -158,20 +151,11 @@ def pagination(page: int, episodes: List):
     return episodes[start:end], total
 
 
-def add_all_episodes_to_playlist(playlist: Playlist, podcast_id: int, repo: AbstractRepository):
-    podcast_episodes = get_episodes(podcast_id, repo)
-
-    if podcast_episodes:
-        for episode in podcast_episodes:
-            if episode not in playlist.list_of_episodes:
-                playlist.add_episode(episode)
-        repo.update_users_playlist(playlist)
+def add_all_episodes_to_playlist(playlist: Playlist, podcast_id: int, repo: AbstractRepository) -> int:
+    # Returns the number of episodes that were not in the playlist already
+    return repo.add_podcast_episodes_to_playlist(playlist, podcast_id)
 
 
-def remove_all_episodes_from_playlist(playlist: Playlist, podcast_id: int, repo: AbstractRepository):
-    podcast_episodes = get_episodes(podcast_id, repo)
-    if podcast_episodes:
-        for episode in podcast_episodes:
-            if episode in playlist.list_of_episodes:
-                playlist.remove_episode(episode)
-        repo.update_users_playlist(playlist)
\ No newline at end of file
+def remove_all_episodes_from_playlist(playlist: Playlist, podcast_id: int, repo: AbstractRepository) -> int:
+    # Returns the number of episodes that were in the playlist
+    return repo.remove_podcast_episodes_from_playlist(playlist, podcast_id)
\ No newline at end of file
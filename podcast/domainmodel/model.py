@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import csv
-from datetime import datetime
-from typing import List
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Iterable, List, Set
 
 
 def validate_non_negative_int(value):
@@ -15,6 +16,32 @@ def validate_non_empty_string(value, field_name="value"):
         raise ValueError(f"{field_name} must be a non-empty string.")
 
 
+def parse_pub_timestamp(pub_date: str) -> int:
+    """ Converts a publication date such as '2017-12-02 02:00:00+00' to seconds since the epoch.
+    Dates without an offset are taken as UTC; missing or unparsable dates give 0, so they sort first. """
+    if not isinstance(pub_date, str) or not pub_date.strip():
+        return 0
+    pub_date = pub_date.strip()
+    try:
+        published = datetime.fromisoformat(pub_date)
+    except ValueError:
+        try:
+            # The feed writes offsets as '+00', which older Pythons only accept padded to '+0000'
+            published = datetime.strptime(pub_date + '00', '%Y-%m-%d %H:%M:%S%z')
+        except ValueError:
+            return 0
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return int(published.timestamp())
+
+
+def title_sort_key(title: str) -> str:
+    """ Key for the catalogue's alphabetical order: case-insensitive, with titles that do not start with a letter
+    after all those that do. """
+    title = title or ''
+    return ('0' if title[:1].isalpha() else '1') + title.lower()
+
+
 class Author:
     def __init__(self, author_id: int, name: str):
         validate_non_negative_int(author_id)
@@ -71,6 +98,7 @@ class Podcast:
         self._author = author
         validate_non_empty_string(title, "Podcast title")
         self._title = title.strip()
+        self._sort_key = title_sort_key(self._title)
         self._image = image
         self._description = description
         self._language = language
@@ -100,6 +128,12 @@ class Podcast:
     def title(self, new_title: str):
         validate_non_empty_string(new_title, "Podcast title")
         self._title = new_title.strip()
+        self._sort_key = title_sort_key(self._title)
+
+    @property
+    def sort_key(self) -> str:
+        """ The title's position in the catalogue's alphabetical order, see title_sort_key. """
+        return self._sort_key
 
     @property
     def image(self) -> str:
@@ -352,11 +386,13 @@ class Episode:
         self._id = episode_id
         self._podcast_id = podcast_id
         self._title = title.strip()
+        self._sort_key = title_sort_key(self._title)
         self._link = episode_link
         self._length = episode_length
         self._description = episode_description
         self._pub_date = pub_date
-
+        # Parsed once here so episodes can be ordered by date without re-parsing pub_date
+        self._pub_timestamp = parse_pub_timestamp(pub_date)
 
     @property
     def id(self) -> int:
@@ -370,6 +406,11 @@ class Episode:
     def title(self) -> str:
         return self._title
 
+    @property
+    def sort_key(self) -> str:
+        """ The title's position in alphabetical order, see title_sort_key. """
+        return self._sort_key
+
     @property
     def link(self) -> str:
         return self._link
@@ -386,10 +427,15 @@ class Episode:
     def pub_date(self) -> str:
         return self._pub_date
 
+    @property
+    def pub_timestamp(self) -> int:
+        return self._pub_timestamp
+
     @title.setter
     def title(self, new_title: str):
         validate_non_empty_string(new_title, "Episode title")
         self._title = new_title.strip()
+        self._sort_key = title_sort_key(self._title)
 
     @description.setter
     def description(self, new_description: str):
@@ -533,7 +579,8 @@ class Playlist:
         self._id = playlist_id
         self._user = playlist_user
         self._title = playlist_title
-        self._episodes = []
+        # episode id -> episode, in the order they were added, so membership, adding and removing are O(1)
+        self._episodes = {}
 
     @property
     def id(self) -> int:
@@ -550,8 +597,20 @@ class Playlist:
     # Added variable types, changed to names use in initialisation
 
     @property
-    def list_of_episodes(self):
-        return self._episodes
+    def list_of_episodes(self) -> List[Episode]:
+        return list(self._episodes.values())
+
+    @property
+    def number_of_episodes(self) -> int:
+        return len(self._episodes)
+
+    @property
+    def episode_ids(self) -> Set[int]:
+        return set(self._episodes)
+
+    def episodes_page(self, offset: int, limit: int) -> List[Episode]:
+        """ Returns up to limit episodes starting at offset, in the order they were added, without copying the rest. """
+        return list(islice(self._episodes.values(), offset, offset + limit))
 
     # how does returning a list work in python?
 
@@ -566,16 +625,36 @@ class Playlist:
     def add_episode(self, episode: Episode):
         if not isinstance(episode, Episode):
             raise TypeError("Expected an Episode instance.")
-        if episode not in self._episodes:
-            self._episodes.append(episode)
+        if episode.id not in self._episodes:
+            self._episodes[episode.id] = episode
 
     def remove_episode(self, episode: Episode):
-        if episode in self._episodes:
-            self._episodes.remove(episode)
+        if isinstance(episode, Episode):
+            self._episodes.pop(episode.id, None)
+
+    def add_episodes(self, episodes: Iterable[Episode]) -> List[Episode]:
+        """ Adds the episodes not already in the playlist, in order, and returns the ones that were added. """
+        added = []
+        for episode in episodes:
+            if not isinstance(episode, Episode):
+                raise TypeError("Expected an Episode instance.")
+            if episode.id not in self._episodes:
+                self._episodes[episode.id] = episode
+                added.append(episode)
+        return added
+
+    def remove_episodes(self, episodes: Iterable[Episode]) -> List[Episode]:
+        """ Removes the episodes that are in the playlist and returns them. Like remove_episode, anything that is not
+        an Episode is ignored. """
+        return [episode for episode in episodes
+                if isinstance(episode, Episode) and self._episodes.pop(episode.id, None) is not None]
+
+    def __contains__(self, episode: Episode) -> bool:
+        return isinstance(episode, Episode) and episode.id in self._episodes
 
     def __repr__(self):
         return (f"<Playlist title: {self._title}, "
-                f"Playlist creator: {self.user}.\nEpisodes: {self._episodes}.>")
+                f"Playlist creator: {self.user}.\nEpisodes: {self.list_of_episodes}.>")
 
     # Check formatting
 
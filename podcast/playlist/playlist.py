@@ -13,24 +13,21 @@ playlist_bp = Blueprint('playlist_bp', __name__)
 @login_required
 def show_playlist(page=0):
     username = session['user_name']
-    playlist_episodes = services.get_user_playlist(username, repo.repo_instance)
-    ep_list = playlist_episodes.list_of_episodes
+    playlist = services.get_user_playlist(username, repo.repo_instance)
 
     playlist_page = request.args.get('page', 1, type=int)
 
     # This counts how many times next, previous, and, etc. have been pressed
     counter = request.args.get('counter', -1, type=int)
 
-    episodes_on_page, total = services.pagination(playlist_page, ep_list)
+    entries_on_page, total = services.get_playlist_page(playlist, playlist_page, repo.repo_instance)
 
-    ep_pod_dict = services.episode_podcast_dict(episodes_on_page, repo.repo_instance)
     return render_template('playlist.html',
-                           ep_list=episodes_on_page,
+                           entries=entries_on_page,
                            name=username,
                            page=playlist_page,
                            total=total,
-                           counter=counter,
-                           ep_pod_dict=ep_pod_dict)
+                           counter=counter)
 
 
 @playlist_bp.route('/remove_episode/<int:episode_id>')
@@ -4,15 +4,11 @@ from podcast.adapters.repository import AbstractRepository
 from podcast.domainmodel.model import Playlist, Episode
 
 
-class NonExistentEpisode(Exception):
-    pass
+EPISODES_PER_PAGE = 9
 
 
-def episode_podcast_dict(episode_list: List[Episode], repo: AbstractRepository) -> dict:
-    ep_pod_dict = {}
-    for episode in episode_list:
-        ep_pod_dict[episode] = repo.get_podcast(episode.pod_id)
-    return ep_pod_dict
+class NonExistentEpisode(Exception):
+    pass
 
 
 def get_user_playlist(username: str, repo: AbstractRepository):
@@ -30,14 +26,13 @@ def get_episode_by_id(episode_id: int, repo: AbstractRepository):
 
 
 def remove_episode_from_playlist(playlist: Playlist, episode: Episode, repo: AbstractRepository):
-    playlist.remove_episode(episode)
-    repo.update_users_playlist(playlist)
-
+    # An unknown episode id gives no episode, and there is nothing to remove
+    if episode is not None:
+        repo.remove_episodes_from_playlist(playlist, [episode])
 
-def pagination(page: int, episodes: List):
-    per_page = 9
-    start = (page - 1) * per_page
-    end = start + per_page
 
-    total = (len(episodes) + per_page - 1) // per_page
-    return episodes[start:end], total
+def get_playlist_page(playlist: Playlist, page: int, repo: AbstractRepository):
+    """ Returns the entries (episode, podcast id, title and image) on one page of the playlist, and the number of
+    pages. Only that page is read from the repository. """
+    entries, total = repo.get_playlist_page(playlist, (max(page, 1) - 1) * EPISODES_PER_PAGE, EPISODES_PER_PAGE)
+    return entries, (total + EPISODES_PER_PAGE - 1) // EPISODES_PER_PAGE
@@ -4,6 +4,9 @@ from podcast.adapters.repository import AbstractRepository
 from podcast.domainmodel.model import Podcast, Author, Episode, Category, Review
 
 
+CATALOGUE_PAGE_SIZE = 12
+
+
 class NonExistentPodcastException(Exception):
     pass
 
@@ -48,9 +51,9 @@ def get_list_of_podcasts_titles(repo: AbstractRepository) -> List[str]:
     return [podcast.title for podcast in repo.get_podcasts()]
 
 
-def pagination(page: int, podcasts: List[Podcast]):
-    per_page = 12
-    start = (page - 1) * per_page
-    end = start + per_page
-    total = (len(podcasts) + per_page - 1) // per_page
-    return podcasts[start:end], total
+def get_catalogue_page(page: int, repo: AbstractRepository):
+    """ Returns the podcasts on one page of the alphabetical catalogue as dicts, and the number of pages.
+    Only the podcasts on that page are fetched and converted. """
+    total = repo.get_catalogue_page_count(CATALOGUE_PAGE_SIZE)
+    podcasts = repo.get_catalogue_page((max(page, 1) - 1) * CATALOGUE_PAGE_SIZE, CATALOGUE_PAGE_SIZE)
+    return podcasts_to_dict(podcasts), total
@@ -15,10 +15,9 @@ def search():
     else:
         query = request.args.get('query')
         filter_by = request.args.get('filter_by')
+    order = request.args.get('order', 'relevance')
 
-    results = services.search_results(repo.repo_instance, query, filter_by)
+    results_on_page, total = services.search_results(repo.repo_instance, query, filter_by, page, order)
 
-    podcasts_on_page, total = services.pagination(page, results)
-
-    return render_template('search.html', query=query, results=podcasts_on_page,
-                           total=total, page=page, filter_by=filter_by)
+    return render_template('search.html', query=query, results=results_on_page,
+                           total=total, page=page, filter_by=filter_by, order=order)
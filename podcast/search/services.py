@@ -1,38 +1,29 @@
 from typing import List, Iterable
 
 from podcast.adapters.repository import AbstractRepository
+from podcast.adapters.search_index import SEARCH_ORDERS
 from podcast.domainmodel.model import Podcast, Author, Episode, Category
 
-
-def search_results(repo: AbstractRepository, query: str, filter_by: str):
-    results = []
-    if filter_by == 'title':
-        results = repo.search_podcast_by_title(query)
-    elif filter_by == 'author':
-        results = repo.search_podcast_by_author(query)
-    elif filter_by == 'category':
-        results = repo.search_podcast_by_category(query)
-    elif filter_by == 'language':
-        results = repo.search_podcast_by_language(query)
-
-    return sort_search(results)
-
-
-def sort_search(podcasts: List[Podcast]):
-    def custom_sort_key(podcast):
-        title = podcast.title
-        if title[0].isalpha():
-            return 0, title.lower()
-        else:
-            return 1, title.lower()
-
-    sorted_podcasts = sorted(podcasts, key=custom_sort_key)
-    return sorted_podcasts
-
-
-def pagination(page: int, podcasts: List[Podcast]):
-    per_page = 8
-    start = (page - 1) * per_page
-    end = start + per_page
-    total = (len(podcasts) + per_page - 1) // per_page
-    return podcasts[start:end], total
+RESULTS_PER_PAGE = 8
+
+# Search filters offered by the search form, and the podcast field each one searches ('all' searches every field)
+SEARCH_FILTERS = {
+    'title': 'title',
+    'author': 'author',
+    'category': 'category',
+    'language': 'language',
+    'all': None,
+}
+
+
+def search_results(repo: AbstractRepository, query: str, filter_by: str, page: int = 1, order: str = 'relevance'):
+    """ Returns one page of the podcasts (or, for the 'episode' filter, the episodes) matching the query, in the
+    given order, and the number of pages. Only that page is fetched from the repository. """
+    if not query or (filter_by not in SEARCH_FILTERS and filter_by != 'episode') or order not in SEARCH_ORDERS:
+        return [], 0
+    offset = (max(page, 1) - 1) * RESULTS_PER_PAGE
+    if filter_by == 'episode':
+        results, total = repo.search_episodes(query, offset, RESULTS_PER_PAGE, order)
+    else:
+        results, total = repo.search_podcasts(query, SEARCH_FILTERS[filter_by], offset, RESULTS_PER_PAGE, order)
+    return results, (total + RESULTS_PER_PAGE - 1) // RESULTS_PER_PAGE
@@ -26,6 +26,7 @@ def client():
         'TESTING': True,  # Set to True during testing.
         'REPOSITORY': 'memory',
         'TEST_DATA_PATH': test_data_path,  # Path for loading test data into the repository.
+        'CATALOGUE_SNAPSHOT': None,  # Always parse the test csv files.
         'WTF_CSRF_ENABLED': False  # test_client will not send a CSRF token, so disable validation.
     })
 
@@ -117,6 +117,28 @@ def test_add_episode_to_playlist(client, setup_user, auth):
     assert b'14' in response.data
 
 
+def test_description_offers_to_remove_episodes_in_playlist(client, setup_user, auth):
+    auth.login()
+    client.get('/add_to_playlist/4885')
+
+    # Episode 4885 of podcast 1 is in the playlist, its other episodes are not
+    response = client.get('/description/1')
+    assert b'/remove_from_playlist/4885' in response.data
+    assert b'/add_to_playlist/4922' in response.data
+    assert b'/remove_from_playlist/4922' not in response.data
+
+
+def test_remove_unknown_episode_from_playlist(client, setup_user, auth):
+    auth.login()
+    client.get('/add_to_playlist/4885')
+
+    # No episode has id 5; the playlist is left as it was
+    response = client.get('/remove_episode/5')
+    assert response.status_code == 302
+    assert response.headers['Location'].startswith('/playlist')
+    assert b'/remove_from_playlist/4885' in client.get('/description/1').data
+
+
 def test_login_required_to_add_episode_to_playlist(client, setup_user, auth):
     response = client.get('/add_to_playlist/1')
     # checking that it moves to another location when not logged in
@@ -193,6 +215,26 @@ def test_searching(client, setup_user, auth):
     assert b'Roy Green Show' in response.data
 
 
+def test_searching_episodes(client):
+    response = client.post('/search', data={'searched': 'cubs', 'filter': 'episode'})
+    assert response.status_code == 200
+    # Episode titles are listed, linking to their podcast's page
+    assert b'in Episodes' in response.data
+    assert b'LOCKED ON CUBS' in response.data
+    assert b'/description/177' in response.data
+
+    response = client.get('/search?query=cubs&filter_by=episode&page=2')
+    assert b'LOCKED ON CUBS' not in response.data
+
+
+def test_searching_ordered_by_title(client):
+    response = client.get('/search?query=radio&filter_by=title&order=title')
+    assert response.status_code == 200
+    # Brian Denny Radio comes before D-Hour Radio Network, and the page links keep the order
+    assert response.data.index(b'Brian Denny Radio') < response.data.index(b'D-Hour Radio Network')
+    assert b'order=relevance' in response.data
+
+
 def test_add_all_episodes_to_playlist(client, setup_user, auth):
     auth.login()
 
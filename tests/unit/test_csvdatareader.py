@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from podcast.adapters.datareader.csvdatareader import CSVDataReader
+from tests.conftest import test_data_path
+
+
+def make_reader():
+    return CSVDataReader(os.path.join(test_data_path, "data/episodes.csv"),
+                         os.path.join(test_data_path, "data/podcasts.csv"))
+
+
+# Authors with the same name should share one Author object and IDs follow first appearance
+def test_read_podcasts_interns_authors():
+    reader = make_reader()
+    reader.read_podcasts()
+
+    # 9 distinct authors in the test csv (including the 'Unknown author' placeholder)
+    assert len(reader.dataset_of_authors) == 9
+    authors = sorted(reader.dataset_of_authors, key=lambda author: author.id)
+    assert [author.id for author in authors] == list(range(1, 10))
+    assert authors[0].name == "D Hour Radio Network"
+    assert authors[-1].name == "Unknown author"
+
+    # Both Audioboom podcasts point at the very same Author object
+    audioboom = [podcast for podcast in reader.dataset_of_podcasts if podcast.author.name == "Audioboom"]
+    assert len(audioboom) == 2
+    assert audioboom[0].author is audioboom[1].author
+
+
+def test_read_podcasts_interns_categories():
+    reader = make_reader()
+    reader.read_podcasts()
+
+    # 14 distinct categories in the test csv, numbered in order of first appearance
+    assert len(reader.dataset_of_categories) == 14
+    categories = sorted(reader.dataset_of_categories, key=lambda category: category.id)
+    assert categories[0].name == "Society & Culture"
+    assert categories[-1].name == "Business"
+
+    # Every podcast in the 'Comedy' category references the same Category object
+    comedy = [category for podcast in reader.dataset_of_podcasts for category in podcast.categories
+              if category.name == "Comedy"]
+    assert len(comedy) == 2
+    assert comedy[0] is comedy[1]
+
+
+# iter_episodes streams the 20 test episodes in lists no bigger than the chunk size
+def test_iter_episodes_yields_bounded_chunks():
+    reader = make_reader()
+    reader.read_podcasts()
+
+    chunks = list(reader.iter_episodes(chunk_size=6))
+    assert [len(chunk) for chunk in chunks] == [6, 6, 6, 2]
+    assert chunks[0][0].id == 1
+    assert chunks[-1][-1].id == 5044
+
+    # Streaming does not keep episodes on the reader or attach them to podcasts
+    assert reader.dataset_of_episodes == []
+    assert all(podcast.episodes == [] for podcast in reader.dataset_of_podcasts)
+
+
+def test_iter_episodes_skips_episodes_of_unknown_podcasts():
+    reader = make_reader()
+    # No podcasts read yet, so no episode can be matched to a podcast
+    assert list(reader.iter_episodes()) == []
+
+
+def test_iter_episodes_rejects_invalid_chunk_size():
+    reader = make_reader()
+    with pytest.raises(ValueError):
+        next(reader.iter_episodes(chunk_size=0))
+
+
+def test_read_episodes_attaches_episodes_to_podcasts():
+    reader = make_reader()
+    reader.read_podcasts()
+    reader.read_episodes()
+
+    assert len(reader.dataset_of_episodes) == 20
+    podcast = next(podcast for podcast in reader.dataset_of_podcasts if podcast.id == 1)
+    assert [episode.id for episode in podcast.episodes] == [4885, 4922, 4954]
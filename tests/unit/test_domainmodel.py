@@ -238,6 +238,19 @@ def test_podcast_change_title(my_podcast):
         my_podcast.title = ""
 
 
+def test_podcast_sort_key(my_podcast):
+    # Titles starting with a letter sort before everything else, ignoring case
+    my_podcast.title = "Dark Throne"
+    assert my_podcast.sort_key == "0dark throne"
+    assert Podcast(2, my_podcast.author, "42 Stories").sort_key == "142 stories"
+    assert Podcast(3, my_podcast.author, "apple").sort_key < Podcast(4, my_podcast.author, "Banana").sort_key
+    # Episodes keep the same key
+    episode = Episode(1, 2, "Dark Throne")
+    assert episode.sort_key == "0dark throne"
+    episode.title = "1999"
+    assert episode.sort_key == "11999"
+
+
 def test_podcast_add_category(my_podcast):
     # Test adding a category to the podcast.
     category = Category(12, "TV & Film")
@@ -487,6 +500,18 @@ def test_episode_initialization():
     assert episode4.pub_date == ""
 
 
+def test_episode_pub_timestamp():
+    # The feed's '+00' offset, a full '+0000' offset and a naive date (taken as UTC) give the same instant
+    assert Episode(1, 1, pub_date="2017-12-02 02:00:00+00").pub_timestamp == 1512180000
+    assert Episode(2, 1, pub_date="2017-12-02 02:00:00+0000").pub_timestamp == 1512180000
+    assert Episode(3, 1, pub_date="2017-12-02 02:00:00").pub_timestamp == 1512180000
+    assert Episode(4, 1, pub_date="2017-12-02 04:00:00+02").pub_timestamp == 1512180000
+
+    # Missing or unparsable dates sort first
+    assert Episode(5, 1).pub_timestamp == 0
+    assert Episode(6, 1, pub_date="13/08/2024").pub_timestamp == 0
+
+
 def test_episode_change_title(my_episode):
     # Test the ability to change the title of an episode.
     my_episode.title = "Episode title"
@@ -843,8 +868,10 @@ def test_playlist_remove_episode(my_playlist):
     my_playlist.add_episode(episode2)
     my_playlist.add_episode(episode3)
 
-    # Try to remove an episode that is not in the playlist
+    # Try to remove an episode that is not in the playlist, or something that is not an episode
     my_playlist.remove_episode(episode4)
+    my_playlist.remove_episode(None)
+    my_playlist.remove_episode("second")
     assert my_playlist.list_of_episodes == [episode1, episode2, episode3]
 
     # Remove episodes from the playlist and assert they are removed correctly
@@ -856,6 +883,26 @@ def test_playlist_remove_episode(my_playlist):
     assert len(my_playlist.list_of_episodes) == 0
 
 
+def test_playlist_bulk_add_and_remove_episodes(my_playlist):
+    episodes = [Episode(i, 2, f"Episode {i}") for i in range(1, 6)]
+    my_playlist.add_episode(episodes[2])
+
+    # Only the episodes not already in the playlist are added, in order, and returned
+    added = my_playlist.add_episodes(episodes)
+    assert added == [episodes[0], episodes[1], episodes[3], episodes[4]]
+    assert my_playlist.list_of_episodes == [episodes[2], episodes[0], episodes[1], episodes[3], episodes[4]]
+    assert episodes[3] in my_playlist
+
+    # Membership is by episode id
+    removed = my_playlist.remove_episodes([Episode(2, 2, "Renamed"), Episode(99, 2, "Not in the playlist"), None])
+    assert [episode.id for episode in removed] == [2]
+    assert episodes[1] not in my_playlist
+    assert my_playlist.list_of_episodes == [episodes[2], episodes[0], episodes[3], episodes[4]]
+
+    with pytest.raises(TypeError):
+        my_playlist.add_episodes([episodes[0], "not an episode"])
+
+
 def test_playlist_equality(my_playlist):
     # Create two playlists with different IDs and check equality
     author1 = Author(1, "Doctor Squee")
@@ -1,7 +1,10 @@
+import threading
+
 import pytest
 
 from podcast.domainmodel.model import Author, Podcast, Category, User, PodcastSubscription, Episode, Review, Playlist
 from podcast.adapters.datareader.csvdatareader import CSVDataReader
+from podcast.adapters.memory_repository import MemoryRepository
 from podcast.adapters.repository import RepositoryException
 from tests.conftest import in_memory_repo
 import unittest
@@ -107,6 +110,19 @@ def test_repository_can_get_podcasts_by_alphabet(in_memory_repo):
     assert sorted_podcasts[2].title == "Zebra Podcast"
 
 
+def test_get_catalogue_page_keeps_order_on_insert(in_memory_repo):
+    author = Author(1, "Audioboom")
+    in_memory_repo.set_podcasts([Podcast(101, author, "zebra Podcast"), Podcast(102, author, "42 Podcast"),
+                                 Podcast(103, author, "Banana Podcast")])
+    # Added podcasts go straight into their place: letters first ignoring case, then everything else
+    in_memory_repo.add_podcast(Podcast(104, author, "Apple Podcast"))
+    in_memory_repo.add_podcast(Podcast(105, author, "(Bracketed) Podcast"))
+
+    assert [podcast.id for podcast in in_memory_repo.get_catalogue_page(0, 10)] == [104, 103, 101, 105, 102]
+    assert [podcast.id for podcast in in_memory_repo.get_catalogue_page(2, 2)] == [101, 105]
+    assert in_memory_repo.get_catalogue_page(5, 2) == []
+
+
 def test_repository_can_get_random_podcasts(in_memory_repo):
     # initialise all appropriate objects
     author = Author(1, "Audioboom")
@@ -227,6 +243,28 @@ def test_add_playlist(in_memory_repo):
     assert in_memory_repo.get_playlists()[0].title == "title"  # checking title is correct
 
 
+# Users are indexed by username and by id
+def test_get_user_by_name_and_id(in_memory_repo):
+    user = User(42, "Listener", "password")
+    in_memory_repo.add_user(user)
+
+    assert in_memory_repo.get_user("Listener") is user
+    assert in_memory_repo.get_user_by_id(42) is user
+    # Usernames are case-sensitive by default
+    assert in_memory_repo.get_user("listener") is None
+    assert in_memory_repo.get_user("nobody") is None
+    assert in_memory_repo.get_user_by_id(43) is None
+
+
+def test_get_user_case_insensitive():
+    repo = MemoryRepository(case_insensitive_usernames=True)
+    user = User(1, "Listener", "password")
+    repo.add_user(user)
+
+    assert repo.get_user("listener") is user
+    assert repo.get_user("LISTENER ") is user
+
+
 # Test that playlist can be retrieved with User object
 def test_get_playlist_by_user(in_memory_repo):
     user = User(1, "name", "password")  # initialise User for mem repo
@@ -251,8 +289,31 @@ def test_get_number_of_episodes(in_memory_repo):
     assert in_memory_repo.get_number_of_episodes() == 23  # Checking the change in episodes as it is added
 
 
-# Testing the playlist can be updated
-def test_update_users_playlist(in_memory_repo):
+# Each podcast's episodes are indexed in date order as they are added
+def test_get_episodes_for_podcast_uses_date_ordered_index(in_memory_repo):
+    # podcast 1 has 3 episodes in the test csv
+    assert in_memory_repo.get_number_of_episodes_for_podcast(1) == 3
+    assert [episode.id for episode in in_memory_repo.get_episodes_for_podcast(1)] == [4885, 4922, 4954]
+
+    oldest = Episode(9001, 1, "Oldest", pub_date="2001-01-01 00:00:00+00")
+    newest = Episode(9002, 1, "Newest", pub_date="2030-01-01 00:00:00+00")
+    in_memory_repo.add_episode(newest)
+    in_memory_repo.add_episodes([oldest, Episode(9003, 2, "Other podcast")])
+
+    episodes = in_memory_repo.get_episodes_for_podcast(1)
+    assert episodes[0] is oldest and episodes[-1] is newest
+    assert in_memory_repo.get_number_of_episodes_for_podcast(1) == 5
+    assert in_memory_repo.get_number_of_episodes() == 23
+
+    # The returned list is a copy of the index, and unknown podcasts have no episodes
+    episodes.clear()
+    assert in_memory_repo.get_number_of_episodes_for_podcast(1) == 5
+    assert in_memory_repo.get_episodes_for_podcast(999) == []
+    assert in_memory_repo.get_number_of_episodes_for_podcast(999) == 0
+
+
+# Testing episodes can be added to a stored playlist
+def test_add_episodes_to_users_playlist(in_memory_repo):
     user = User(1, "name", "password")  # initialise User for mem repo
     in_memory_repo.add_user(user)  # adds user to mem repo
     playlist = Playlist(1, user, "title")  # initialise Playlist object
@@ -264,15 +325,72 @@ def test_update_users_playlist(in_memory_repo):
     episode1 = Episode(1, 1, "Episode 1", pub_date="2023-08-19 10:00:00+0000")  # Initialise episodes
     episode2 = Episode(2, 2, "Episode 2", pub_date="2023-08-18 09:00:00+0000")
     episode3 = Episode(3, 3, "Episode 3", pub_date="2023-08-20 11:00:00+0000")
-    user_playlist.add_episode(episode1)  # Added episodes to a playlist object
-    user_playlist.add_episode(episode2)
-    user_playlist.add_episode(episode3)
-    in_memory_repo.update_users_playlist(user_playlist)  # Updates playlist
+    # Added episodes through the repository
+    assert in_memory_repo.add_episodes_to_playlist(user_playlist, [episode1, episode2, episode3]) == 3
     assert in_memory_repo.get_playlists() == [user_playlist]
     # Checks that it has the episodes that was added to that playlist
     assert in_memory_repo.get_playlists()[0].list_of_episodes == [episode1, episode2, episode3]
 
 
+# The playlist list and the user index stay in step when a playlist is replaced
+def test_add_and_remove_playlist_episodes(in_memory_repo):
+    user = User(1, "listener", "password")
+    playlist = Playlist(1, user, "Mine")
+    in_memory_repo.add_playlist(playlist)
+
+    # The counts are of the episodes actually added or removed
+    assert in_memory_repo.add_episodes_to_playlist(playlist, [in_memory_repo.get_episode(4922)]) == 1
+    assert in_memory_repo.add_podcast_episodes_to_playlist(playlist, 1) == 2
+    assert [episode.id for episode in in_memory_repo.get_playlist_by_user(user).list_of_episodes] == [4922, 4885, 4954]
+    assert in_memory_repo.remove_episodes_from_playlist(playlist, [in_memory_repo.get_episode(4885)]) == 1
+    assert in_memory_repo.remove_podcast_episodes_from_playlist(playlist, 1) == 2
+    assert in_memory_repo.remove_podcast_episodes_from_playlist(playlist, 1) == 0
+    assert playlist.list_of_episodes == []
+
+
+def test_add_playlist_keeps_user_index_consistent(in_memory_repo):
+    user = User(1, "name", "password")
+    other_user = User(2, "other", "password")
+    in_memory_repo.add_playlist(Playlist(1, user, "first"))
+
+    # A new playlist object with the same id replaces the old one everywhere
+    replacement = Playlist(1, user, "replacement")
+    in_memory_repo.add_playlist(replacement)
+    assert in_memory_repo.get_playlist_by_user(user) is replacement
+    assert in_memory_repo.get_playlists() == [replacement]
+    assert in_memory_repo.get_playlists()[0].title == "replacement"
+
+    # Reusing the id for another user leaves the first user without a playlist
+    in_memory_repo.add_playlist(Playlist(1, other_user, "moved"))
+    assert in_memory_repo.get_playlist_by_user(user) is None
+    assert in_memory_repo.get_playlist_by_user(other_user).title == "moved"
+    assert len(in_memory_repo.get_playlists()) == 1
+    assert in_memory_repo.get_playlist_by_user(None) is None
+
+
+# Concurrent posts each get their own review id
+def test_create_review_allocates_unique_ids_under_concurrency(in_memory_repo):
+    user = User(1, "name", "password")
+    podcast = in_memory_repo.get_podcast(1)
+    # An existing review means new ids continue after it
+    in_memory_repo.add_review(Review(10, user, podcast, 3, "Existing review"))
+
+    def post_reviews():
+        for _ in range(200):
+            in_memory_repo.create_review(user, podcast, 4, "Great podcast!")
+
+    threads = [threading.Thread(target=post_reviews) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = [review.id for review in in_memory_repo.get_reviews()]
+    assert len(ids) == len(set(ids)) == 1601
+    assert sorted(ids)[1:] == list(range(11, 1611))
+    assert in_memory_repo.get_rating_summary(1).count == 1601
+
+
 # testing retrieval of all reviews in repo
 def test_get_reviews(in_memory_repo):
     # starts with no reviews
@@ -358,53 +476,67 @@ def test_get_reviews_from_podcast(in_memory_repo):
     assert len(reviews_for_non_existent_podcast) == 0  # return empty list
 
 
+def test_search_episodes(in_memory_repo):
+    # The 3 Locked On Cubs episodes, each page fetched separately
+    first_page = in_memory_repo.search_episodes("cubs", 0, 2)
+    second_page = in_memory_repo.search_episodes("cubs", 2, 2)
+    assert first_page.total == second_page.total == 3
+    assert len(first_page.results) == 2
+    assert {episode.id for episode in first_page.results + second_page.results} == {4399, 4400, 4401}
+
+    # Every word must match, and markup in the descriptions is not searched
+    assert [episode.id for episode in in_memory_repo.search_episodes("cubs episode").results] == [4400, 4401]
+    assert in_memory_repo.search_episodes("feedflare") == ([], 0)
+
+    # Added episodes are searchable straight away
+    in_memory_repo.add_episode(Episode(9999, 1, "Cubs Bonus"))
+    assert in_memory_repo.search_episodes("cubs bonus").results[0].id == 9999
+
+
 def test_search_podcast_by_author(in_memory_repo):
     # get list that is filter by the specific search
-    filtered_list = in_memory_repo.search_podcast_by_author("Audioboom")
+    filtered_list = in_memory_repo.search_podcasts("Audioboom", "author").results
     assert len(filtered_list) == 2  # Checking its correct length (only 2 Audioboom podcast in test files)
     # Checking it is the correct podcast:
-    assert filtered_list[0].title == "Crawlspace: True Crime & Mysteries"
-    assert filtered_list[1].title == "AHDB"
+    assert {podcast.title for podcast in filtered_list} == {"Crawlspace: True Crime & Mysteries", "AHDB"}
 
     # Checking if there is nothing searched, it will just return an empty list
-    nothing_list = in_memory_repo.search_podcast_by_author("NotExist")
+    nothing_list = in_memory_repo.search_podcasts("NotExist", "author").results
     assert nothing_list == []
 
 
 def test_search_podcast_by_title(in_memory_repo):
     # get list that is filter by the specific search
-    filtered_list = in_memory_repo.search_podcast_by_title("radio")
+    filtered_list = in_memory_repo.search_podcasts("radio", "title").results
     assert len(filtered_list) == 3  # 3 podcast that has radio in its title in test CSV files
     # Checking that it is the correct podcasts
-    assert filtered_list[0].title == "D-Hour Radio Network"
-    assert filtered_list[1].title == "Brian Denny Radio"
-    assert filtered_list[2].title == "Onde Road - Radio Popolare"
+    assert {podcast.title for podcast in filtered_list} == {"D-Hour Radio Network", "Brian Denny Radio",
+                                                            "Onde Road - Radio Popolare"}
 
     # Checking if there is nothing searched, it will just return an empty list
-    nothing_list = in_memory_repo.search_podcast_by_author("NotExist")
+    nothing_list = in_memory_repo.search_podcasts("NotExist", "author").results
     assert nothing_list == []
 
 
 def test_search_podcast_by_category(in_memory_repo):
     # get list that is filter by the specific search
-    filtered_list = in_memory_repo.search_podcast_by_category("Comedy")
+    filtered_list = in_memory_repo.search_podcasts("Comedy", "category").results
     assert len(filtered_list) == 2  # 2 podcast has Comedy in its categories from test files
     # Checking that it is the correct podcasts
-    assert filtered_list[0].title == "Brian Denny Radio"
-    assert filtered_list[1].title == "The Mandarian Orange Show"
+    assert {podcast.title for podcast in filtered_list} == {"Brian Denny Radio", "The Mandarian Orange Show"}
 
     # Checking if there is nothing searched, it will just return an empty list
-    nothing_list = in_memory_repo.search_podcast_by_author("NotExist")
+    nothing_list = in_memory_repo.search_podcasts("NotExist", "author").results
     assert nothing_list == []
 
 
 def test_search_podcast_by_language(in_memory_repo):
     # get list that is filter by the specific search
-    filtered_list = in_memory_repo.search_podcast_by_language("Italian")
+    filtered_list = in_memory_repo.search_podcasts("Italian", "language").results
     assert len(filtered_list) == 1  # Only 1 Italian podcast
     # Checking it is the right podcast
     assert filtered_list[0].title == "Onde Road - Radio Popolare"
 
     # Checking if there is nothing searched, it will just return an empty list
-    nothing_list = in_memory_repo.search_podcast_by_author("NotExist")
+    nothing_list = in_memory_repo.search_podcasts("NotExist", "author").results
     assert nothing_list == []
\ No newline at end of file
@@ -0,0 +1,159 @@
+import random
+
+import pytest
+
+from podcast.adapters.search_index import (FIELD_WEIGHTS, MAX_PREFIX_EXPANSIONS, EpisodeSearchIndex,
+                                           PodcastSearchIndex, SearchIndex, podcast_fields, tokenize)
+from podcast.domainmodel.model import Author, Category, Episode, Podcast
+
+
+def make_podcast(podcast_id, title, author_name="Author", categories=(), description="", language="English"):
+    podcast = Podcast(podcast_id, Author(podcast_id, author_name), title, description=description, language=language)
+    for category_id, name in enumerate(categories):
+        podcast.add_category(Category(category_id, name))
+    return podcast
+
+
+def test_tokenize_strips_html_and_case():
+    assert tokenize("<p>Crime &amp; <b>Mystery</b></p> Radio") == ["crime", "mystery", "radio"]
+    assert tokenize("") == []
+    assert tokenize(None) == []
+
+
+def test_search_matches_every_word_by_prefix():
+    index = PodcastSearchIndex()
+    index.add_all([
+        make_podcast(1, "Morning Radio Show"),
+        make_podcast(2, "Evening Radio"),
+        make_podcast(3, "Morning Coffee"),
+    ])
+
+    # Every query word must match, either whole or as the start of a word
+    assert [podcast.id for podcast in index.search("morn radio")] == [1]
+    assert {podcast.id for podcast in index.search("radio")} == {1, 2}
+    assert index.search("adio") == []
+    assert index.search("   ") == []
+
+
+def test_search_ranks_by_field_weight_and_restricts_fields():
+    index = PodcastSearchIndex()
+    index.add_all([
+        make_podcast(1, "Daily News", description="Comedy sketches every day"),
+        make_podcast(2, "Laugh Track", categories=["Comedy"]),
+        make_podcast(3, "Comedy Hour"),
+    ])
+
+    # A title match outranks a category match, which outranks a description match
+    assert [podcast.id for podcast in index.search("comedy")] == [3, 2, 1]
+    assert [podcast.id for podcast in index.search("comedy", ["category"])] == [2]
+    assert [podcast.id for podcast in index.search("comedy", ["description"])] == [1]
+
+
+def test_short_words_match_whole_words_and_prefixes_match_the_most_common_words():
+    index = PodcastSearchIndex()
+    index.add_all([make_podcast(1, "A Radio Show"), make_podcast(2, "Ab Radio"), make_podcast(3, "Abc Radio")])
+    assert [podcast.id for podcast in index.search("a", ["title"])] == [1]
+    assert [podcast.id for podcast in index.search("ab", ["title"])] == [2]
+    assert [podcast.id for podcast in index.search("abc", ["title"])] == [3]
+
+    # 'word' is itself a word, and the start of more words than a prefix expands to. 'word' and the most common
+    # of the others are matched; the rarest word is not.
+    podcasts = [make_podcast(4, "word")]
+    for i in range(MAX_PREFIX_EXPANSIONS):
+        podcasts.extend(make_podcast(100 * (i + 1) + j, f"word{i}") for j in range(2))
+    podcasts.append(make_podcast(5000, "wordrare"))
+    index.add_all(podcasts)
+    matched = {podcast.id for podcast in index.search("word", ["title"])}
+    assert 4 in matched
+    assert 5000 not in matched
+    assert len(matched) == 1 + 2 * (MAX_PREFIX_EXPANSIONS - 1)
+
+
+def test_pages_of_many_matches_are_ranked_like_every_match():
+    # Enough matches that a page is ranked without scoring every match, with plenty of tied scores
+    rng = random.Random(0)
+    words = ["radio", "news", "daily", "crime", "show"]
+    index = PodcastSearchIndex()
+    index.add_all([make_podcast(i, " ".join(rng.choice(words) for _ in range(3)), author_name=rng.choice(words),
+                                description=" ".join(rng.choice(words) for _ in range(rng.randrange(6))))
+                   for i in range(1, 2001)])
+
+    for query, fields in [("radio", None), ("radio", ["title"]), ("news daily", None), ("cri", ["description"])]:
+        for order in ("relevance", "title"):
+            everything, total = index.search_page(query, fields=fields, order=order)
+            for offset in (0, 8, 40):
+                assert index.search_page(query, offset, 8, fields, order) == (everything[offset:offset + 8], total)
+
+
+def test_top_results_break_ties_by_id_when_found_out_of_order():
+    # 'radio' and 'radar' are in as many titles, so 'Radio Radio' (read first, as it has the most occurrences)
+    # ties with 'Radio Radar', which has the smaller id and so ranks first
+    podcasts = [make_podcast(1, "Radar"), make_podcast(2, "Radio Radar"), make_podcast(1000, "Radio Radio")]
+    podcasts.extend(make_podcast(i, "Radio" if i % 2 else "Radar") for i in range(3, 301))
+    index = PodcastSearchIndex()
+    index.add_all(podcasts)
+
+    assert [podcast.id for podcast in index.search_page("rad", limit=1, fields=["title"])[0]] == [2]
+    assert index.search_page("rad", limit=3, fields=["title"])[0] == index.search("rad", ["title"])[:3]
+
+
+def test_add_replaces_and_remove_forgets_a_podcast():
+    index = PodcastSearchIndex()
+    index.add_all([make_podcast(1, "Old Title"), make_podcast(2, "Other Show")])
+    # Searching sorts the vocabulary; later adds keep it sorted
+    assert [podcast.id for podcast in index.search("old")] == [1]
+
+    index.add(make_podcast(1, "New Title"))
+    assert index.search("old") == []
+    assert [podcast.id for podcast in index.search("new")] == [1]
+    assert len(index) == 2
+
+    index.remove(1)
+    assert index.search("title") == []
+    assert [podcast.id for podcast in index.search("other")] == [2]
+    assert len(index) == 1
+
+
+def test_add_all_indexes_when_the_index_is_first_used():
+    indexed = []
+    index = SearchIndex(FIELD_WEIGHTS, lambda podcast: indexed.append(podcast.id) or podcast_fields(podcast))
+    index.add_all([make_podcast(1, "Old Title"), make_podcast(2, "Other Show")])
+    assert indexed == []
+
+    # Queued podcasts are indexed before a later add, which then replaces the queued version
+    index.add(make_podcast(1, "New Title"))
+    assert indexed == [1, 2, 1]
+    assert index.search("old") == []
+    assert [podcast.id for podcast in index.search("title")] == [1]
+    assert len(index) == 2
+
+
+def test_episode_index_ignores_markup_and_pages_results():
+    index = EpisodeSearchIndex()
+    index.add_all([Episode(i, 1, f"Cubs Episode {i}",
+                           episode_description=f'<a href="http://cubs.example/{i}">Listen</a>') for i in range(1, 11)])
+
+    # Words only found inside tags are never indexed
+    assert index.search("example") == []
+    assert index.search("href") == []
+
+    # A page of the results, in the same order as the full list, and the total across every page
+    everything = index.search("cubs")
+    page, total = index.search_page("cubs", offset=4, limit=3)
+    assert total == 10
+    assert page == everything[4:7]
+    assert index.search_page("cubs", offset=9, limit=3) == (everything[9:], 10)
+    assert index.search_page("nothing", limit=3) == ([], 0)
+
+
+def test_search_page_orders_by_title():
+    index = PodcastSearchIndex()
+    index.add_all([make_podcast(1, "zebra radio"), make_podcast(2, "42 Radio"), make_podcast(3, "Apple Radio"),
+                   make_podcast(4, "Radio Radio Radio")])
+
+    # Titles starting with a letter first, ignoring case, whatever their relevance
+    assert [podcast.id for podcast in index.search_page("radio", order='title')[0]] == [3, 4, 1, 2]
+    assert index.search_page("radio", offset=1, limit=2, order='title') == (index.search_page(
+        "radio", order='title')[0][1:3], 4)
+    with pytest.raises(ValueError):
+        index.search_page("radio", order='unknown')
@@ -5,7 +5,7 @@ import pytest
 from podcast import User
 from podcast.domainmodel.model import Author, Podcast, Review
 from tests.conftest import in_memory_repo
-from podcast.podcasts.services import (get_podcasts_by_alphabet, get_list_of_podcasts_titles,
+from podcast.podcasts.services import (get_podcasts_by_alphabet, get_list_of_podcasts_titles, get_catalogue_page,
                                        NonExistentPodcastException)
 from podcast.description.services import (get_episodes, get_podcast_by_id, episodes_to_dict, NonExistentEpisode,
                                           podcast_to_dict, NonExistentPodcast)
@@ -16,8 +16,6 @@ from podcast.playlist import services as playlist_services
 from podcast.description import services as description_services
 from podcast.search import services as search_services
 
-from podcast.search.services import pagination
-
 
 # podcast.services
 
@@ -33,6 +31,17 @@ def test_get_podcasts_by_alphabet(in_memory_repo):
     assert sorted_podcasts_dict[1]['id'] == 5  # Checking for second podcast
 
 
+# Tests whether you can get one page of the catalogue
+def test_get_catalogue_page(in_memory_repo):
+    every_podcast = get_podcasts_by_alphabet(get_list_of_podcasts_titles(in_memory_repo), in_memory_repo)
+
+    # The 11 test podcasts fit on one page of 12, in the same order as the full alphabetical list
+    podcasts_on_page, total = get_catalogue_page(1, in_memory_repo)
+    assert podcasts_on_page == every_podcast
+    assert total == 1
+    assert get_catalogue_page(2, in_memory_repo) == ([], 1)
+
+
 # Tests whether you can get a list of podcasts titles
 def test_get_list_of_podcasts_titles(in_memory_repo):
     list_of_titles = get_list_of_podcasts_titles(in_memory_repo)
@@ -83,9 +92,16 @@ def test_get_podcast_by_id(in_memory_repo):
     assert podcast_dict2['title'] == "Mike Safo"
 
 
+def test_get_podcast_by_id_with_sparse_ids(in_memory_repo):
+    # The test csv skips ids, so podcast 100 is only the 9th podcast
+    podcast_dict = get_podcast_by_id(100, in_memory_repo)
+    assert podcast_dict['id'] == 100
+    assert podcast_dict['title'] == in_memory_repo.get_podcast(100).title
+
+
 def test_get_podcast_by_id_raises_exception_when_None(in_memory_repo):
     with pytest.raises(NonExistentPodcast):
-        podcast_dict3 = get_podcast_by_id(100, in_memory_repo)
+        podcast_dict3 = get_podcast_by_id(999, in_memory_repo)
 
 
 def test_episodes_to_dict(in_memory_repo):
@@ -227,7 +243,7 @@ def test_add_episode_to_playlist(in_memory_repo):
 
 
 def test_remove_episode_from_playlist(in_memory_repo):
-    episode_id = 5
+    episode_id = 293
     # initialised with necessary info
     episode2 = playlist_services.get_episode_by_id(episode_id, in_memory_repo)
     new_user_id = 4420227291029499
@@ -248,33 +264,44 @@ def test_remove_episode_from_playlist(in_memory_repo):
     assert playlist.list_of_episodes == []  # check that the episode has been removed after use of the method
 
 
-def test_get_episode_podcast_dict(in_memory_repo):
-    podcast1 = in_memory_repo.get_podcast(1)  # D-Hour Radio Network
-    podcast2 = in_memory_repo.get_podcast(177)  # Locked on Cubs
+def test_get_playlist_episode_ids(in_memory_repo):
+    auth_services.add_user(4420227291029499, 'name', 'abcd1A23', in_memory_repo)
+    assert description_services.get_playlist_episode_ids('name', in_memory_repo) == set()
+
+    playlist = description_services.get_user_playlists('name', in_memory_repo)
+    description_services.add_episode_to_playlist(playlist, in_memory_repo.get_episode(4885), in_memory_repo)
+    description_services.add_episode_to_playlist(playlist, in_memory_repo.get_episode(293), in_memory_repo)
+    assert description_services.get_playlist_episode_ids('name', in_memory_repo) == {4885, 293}
 
-    # initialise some episodes for the list
-    episode1 = playlist_services.get_episode_by_id(11, in_memory_repo)  # Locked on Cubs
-    episode2 = playlist_services.get_episode_by_id(12, in_memory_repo)  # Locked on Cubs
-    episode3 = playlist_services.get_episode_by_id(13, in_memory_repo)  # Locked on Cubs
-    episode4 = playlist_services.get_episode_by_id(15, in_memory_repo)  # D-Hour Radio Network
-    episode5 = playlist_services.get_episode_by_id(18, in_memory_repo)  # D-Hour Radio Network
-    episode6 = playlist_services.get_episode_by_id(19, in_memory_repo)  # D-Hour Radio Network
 
-    episode_list = [episode1, episode2, episode3, episode4, episode5, episode6]
+def test_get_episode_by_id_with_sparse_ids(in_memory_repo):
+    # Episode ids in the test csv are sparse, so ids are not list positions
+    assert playlist_services.get_episode_by_id(4885, in_memory_repo).pod_id == 1
+    assert playlist_services.get_episode_by_id(5, in_memory_repo) is None
 
-    # use method to get the dict
-    ep_pod_dict = playlist_services.episode_podcast_dict(episode_list, in_memory_repo)
 
-    # get an episode from the list to check
-    assert ep_pod_dict[episode1] == podcast2  # check that the episode added in first is corresponding
-    assert ep_pod_dict[episode1].title == podcast2.title  # to the correct podcast
-    assert ep_pod_dict[episode1].description == podcast2.description
-    # check the rest of the episodes is correctly matched up with podcast
-    assert ep_pod_dict[episode2] == podcast2
-    assert ep_pod_dict[episode3] == podcast2
-    assert ep_pod_dict[episode4] == podcast1
-    assert ep_pod_dict[episode5] == podcast1
-    assert ep_pod_dict[episode6] == podcast1
+def test_get_playlist_page(in_memory_repo):
+    user = User(1, "listener", "password")
+    in_memory_repo.add_user(user)
+    playlist = playlist_services.get_user_playlist("listener", in_memory_repo)
+    # 3 Locked on Cubs episodes, then 3 D-Hour Radio Network ones, then the other 14
+    ids = [4399, 4400, 4401, 4885, 4922, 4954]
+    others = [1, 70, 85, 245, 293, 796, 2322, 2972, 2973, 4338, 4548, 4888, 4909, 5044]
+    episodes = [in_memory_repo.get_episode(episode_id) for episode_id in ids + others]
+    in_memory_repo.add_episodes_to_playlist(playlist, episodes)
+
+    # 20 episodes is 3 pages of 9, each entry carrying its podcast's id, title and image
+    entries, pages = playlist_services.get_playlist_page(playlist, 1, in_memory_repo)
+    assert pages == 3
+    assert [entry.episode.id for entry in entries[:6]] == ids
+    assert entries[0].podcast_id == 177
+    assert entries[0].podcast_title == in_memory_repo.get_podcast(177).title
+    assert entries[3].podcast_title == "D-Hour Radio Network"
+    assert entries[3].podcast_image == in_memory_repo.get_podcast(1).image
+
+    # The last page holds the remaining 2
+    entries, pages = playlist_services.get_playlist_page(playlist, 3, in_memory_repo)
+    assert len(entries) == 2
 
 
 def test_add_review_to_podcast(in_memory_repo):
@@ -344,63 +371,71 @@ def test_retrieve_podcast_reviews_returns_empty_list_when_no_reviews(in_memory_r
     assert len(reviews) == 0
 
 
-def test_sort_search(in_memory_repo):
-    podcasts = in_memory_repo.get_podcasts()
-
-    # Checking that it is currently in Ascending order of IDs
-    previous_id = None
-    for podcast in podcasts:
-        if previous_id is not None:
-            assert podcast.id >= previous_id
-        previous_id = podcast.id
-
-    # Sorting the podcasts with the method
-    sorted_podcasts = search_services.sort_search(podcasts)
-    # showing that it is different order
-    assert len(sorted_podcasts) == len(podcasts)
-    assert podcasts != sorted_podcasts
-
-    # Checking that it is alphabetically sorted
-    previous_title = None
-    for podcast in sorted_podcasts:
-        if previous_title is not None:
-            assert podcast.title >= previous_title
-        previous_title = podcast.title
-
-
-def test_pagination():
-    # Create a list of 20 sample podcasts
-    podcasts = [Podcast(podcast_id=i, title=f"Podcast {i}", author=None) for i in range(1, 21)]
-
-    # Test first page
-    page = 1
-    paginated_podcasts, total_pages = pagination(page, podcasts)
-    assert len(paginated_podcasts) == 8  # First page should contain 8 podcasts.
-    assert paginated_podcasts[0]._title == "Podcast 1"  # First podcast on the first page should be 'Podcast 1'.
-    assert paginated_podcasts[-1]._title == "Podcast 8"  # Last podcast on the first page should be 'Podcast 8'.
-    assert total_pages == 3  # Total pages should be 3.
-
-    # Test second page
-    page = 2
-    paginated_podcasts, total_pages = pagination(page, podcasts)
-    assert len(paginated_podcasts) == 8  # Second page should contain 8 podcasts.
-    assert paginated_podcasts[0]._title == "Podcast 9"  # First podcast on the second page should be 'Podcast 9'.
-    assert paginated_podcasts[-1]._title == "Podcast 16"  # Last podcast on the second page should be 'Podcast 16'.
-    assert total_pages == 3, "Total pages should be 3."
-
-    # Test third page
-    page = 3
-    paginated_podcasts, total_pages = pagination(page, podcasts)
-    assert len(paginated_podcasts) == 4  # Third page should contain 4 podcasts."
-    assert paginated_podcasts[0]._title == "Podcast 17"  # First podcast on the third page should be 'Podcast 17'.
-    assert paginated_podcasts[-1]._title == "Podcast 20"  # Last podcast on the third page should be 'Podcast 20'.
-    assert total_pages == 3, "Total pages should be 3."
-
-    # Test out of range page
-    page = 4
-    paginated_podcasts, total_pages = pagination(page, podcasts)
-    assert len(paginated_podcasts) == 0  # Fourth page should contain no podcasts.
-    assert total_pages == 3  # Total pages should be 3.
+def test_get_average_podcast_rating(in_memory_repo):
+    user = User(1, "test_user", "password")
+    podcast = in_memory_repo.get_podcast(1)
+
+    # No reviews yet
+    assert description_services.get_average_podcast_rating(1, in_memory_repo) == {
+        'number': 0, 'stars': "☆☆☆☆☆", 'count': 0}
+
+    in_memory_repo.add_review(Review(1, user, podcast, 5, "Amazing podcast!"))
+    in_memory_repo.add_review(Review(2, user, podcast, 2, "Not for me"))
+
+    # The running totals give the count and average of both reviews
+    average = description_services.get_average_podcast_rating(1, in_memory_repo)
+    assert average == {'number': 3.5, 'stars': "★★★★☆", 'count': 2}
+    assert in_memory_repo.get_rating_summary(6) == (0, 0)
+
+
+def test_search_results_ranked_by_relevance(in_memory_repo):
+    # 3 podcasts in the test csv have 'radio' in their title, all on the first page
+    results, total_pages = search_services.search_results(in_memory_repo, "radio", "title")
+    assert {podcast.title for podcast in results} == {"D-Hour Radio Network", "Brian Denny Radio",
+                                                      "Onde Road - Radio Popolare"}
+    assert total_pages == 1
+
+    # Searches are by word prefix, and 'all' also looks at the other fields
+    results, total_pages = search_services.search_results(in_memory_repo, "ital", "language")
+    assert [podcast.title for podcast in results] == ["Onde Road - Radio Popolare"]
+    assert len(search_services.search_results(in_memory_repo, "radio", "all")[0]) >= 3
+
+    # New podcasts are searchable straight away
+    in_memory_repo.add_podcast(Podcast(999, Author(999, "New Author"), "Brand New Radio"))
+    results, total_pages = search_services.search_results(in_memory_repo, "brand radio", "title")
+    assert "Brand New Radio" in [podcast.title for podcast in results]
+
+    # An empty query, an unknown filter or an unknown order finds nothing
+    assert search_services.search_results(in_memory_repo, "", "title") == ([], 0)
+    assert search_services.search_results(in_memory_repo, "radio", "unknown") == ([], 0)
+    assert search_services.search_results(in_memory_repo, "radio", "title", order="unknown") == ([], 0)
+
+
+def test_search_results_pages_and_orders(in_memory_repo):
+    # 'eng' is the start of a word (English) in most podcasts; only one page of them is returned
+    results, total_pages = search_services.search_results(in_memory_repo, "eng", "all", page=1, order="title")
+    total = in_memory_repo.search_podcasts("eng").total
+    assert total > search_services.RESULTS_PER_PAGE
+    assert total_pages == (total + search_services.RESULTS_PER_PAGE - 1) // search_services.RESULTS_PER_PAGE
+    assert len(results) == search_services.RESULTS_PER_PAGE
+
+    # The pages are in the same order as the whole list sorted by title
+    every_page = []
+    for page in range(1, total_pages + 1):
+        every_page.extend(search_services.search_results(in_memory_repo, "eng", "all", page, "title")[0])
+    assert every_page == sorted(in_memory_repo.search_podcasts("eng").results,
+                                key=lambda podcast: (podcast.sort_key, podcast.id))
+
+
+def test_search_results_for_episodes(in_memory_repo):
+    # The 3 'Say It! Radio' episodes fit on one page
+    episodes, total_pages = search_services.search_results(in_memory_repo, "radio", "episode", 1)
+    assert {episode.id for episode in episodes} == {4885, 4922, 4954}
+    assert total_pages == 1
+
+    # 'tallin' matches 3 episodes, and a page past the end is empty
+    assert search_services.search_results(in_memory_repo, "tallin", "episode", 2) == ([], 1)
+    assert search_services.search_results(in_memory_repo, "", "episode") == ([], 0)
 
 
 def test_add_all_episodes_to_playlist(in_memory_repo):
@@ -0,0 +1,107 @@
+import os
+import shutil
+
+import pytest
+
+from podcast.adapters.memory_repository import MemoryRepository
+from podcast.adapters import repository_populate, snapshot
+from tests.conftest import test_data_path
+
+
+@pytest.fixture
+def data_copy(tmp_path):
+    # Copy the test csv files so they can be edited without touching the real test data
+    shutil.copytree(os.path.join(test_data_path, "data"), tmp_path / "data")
+    return tmp_path
+
+
+def test_populate_writes_snapshot(data_copy):
+    snapshot_path = str(data_copy / "catalogue.snapshot")
+    repo = MemoryRepository()
+    repository_populate.populate(data_copy, repo, False, snapshot_path)
+
+    assert os.path.exists(snapshot_path)
+    assert repo.get_number_of_podcasts() == 11
+
+
+def test_populate_loads_snapshot_without_parsing_csv(data_copy, monkeypatch):
+    snapshot_path = str(data_copy / "catalogue.snapshot")
+    repository_populate.populate(data_copy, MemoryRepository(), False, snapshot_path)
+
+    # A valid snapshot means the csv files are never parsed
+    def fail(*args):
+        raise AssertionError("csv files should not be read")
+    monkeypatch.setattr(repository_populate, "read_catalogue", fail)
+
+    repo = MemoryRepository()
+    repository_populate.populate(data_copy, repo, False, snapshot_path)
+    assert repo.get_number_of_podcasts() == 11
+    assert repo.get_podcast(1).title == "D-Hour Radio Network"
+    assert repo.get_number_of_episodes() == 20
+
+
+def test_snapshot_survives_touched_but_unchanged_csv(data_copy):
+    snapshot_path = str(data_copy / "catalogue.snapshot")
+    podcast_path = str(data_copy / "data" / "podcasts.csv")
+    episode_path = str(data_copy / "data" / "episodes.csv")
+    repository_populate.populate(data_copy, MemoryRepository(), False, snapshot_path)
+
+    # Newer mtime but identical content: the hash still matches
+    stat = os.stat(podcast_path)
+    os.utime(podcast_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert snapshot.load_snapshot(snapshot_path, [podcast_path, episode_path]) is not None
+
+
+def test_snapshot_rebuilt_when_csv_changes(data_copy):
+    snapshot_path = str(data_copy / "catalogue.snapshot")
+    podcast_path = data_copy / "data" / "podcasts.csv"
+    repository_populate.populate(data_copy, MemoryRepository(), False, snapshot_path)
+
+    # Rename a podcast in the csv file
+    podcast_path.write_text(podcast_path.read_text(encoding="utf-8").replace("D-Hour Radio Network,",
+                                                                             "Renamed Network,", 1),
+                            encoding="utf-8")
+
+    repo = MemoryRepository()
+    repository_populate.populate(data_copy, repo, False, snapshot_path)
+    assert repo.get_podcast(1).title == "Renamed Network"
+
+
+def test_snapshot_with_other_version_is_ignored(data_copy, monkeypatch):
+    snapshot_path = str(data_copy / "catalogue.snapshot")
+    sources = [str(data_copy / "data" / "podcasts.csv"), str(data_copy / "data" / "episodes.csv")]
+    repository_populate.populate(data_copy, MemoryRepository(), False, snapshot_path)
+
+    monkeypatch.setattr(snapshot, "SNAPSHOT_VERSION", snapshot.SNAPSHOT_VERSION + 1)
+    assert snapshot.load_snapshot(snapshot_path, sources) is None
+
+
+def test_corrupt_snapshot_is_ignored(data_copy):
+    snapshot_path = data_copy / "catalogue.snapshot"
+    snapshot_path.write_bytes(b"not a snapshot")
+
+    repo = MemoryRepository()
+    repository_populate.populate(data_copy, repo, False, str(snapshot_path))
+    assert repo.get_number_of_podcasts() == 11
+
+
+def test_truncated_snapshot_is_ignored(data_copy):
+    snapshot_path = data_copy / "catalogue.snapshot"
+    sources = [str(data_copy / "data" / "podcasts.csv"), str(data_copy / "data" / "episodes.csv")]
+    repository_populate.populate(data_copy, MemoryRepository(), False, str(snapshot_path))
+
+    # Cut the snapshot off part way through the catalogue, which fails to unpickle in ways other than PickleError
+    contents = snapshot_path.read_bytes()
+    for length in (len(contents) // 2, len(contents) - 1):
+        snapshot_path.write_bytes(contents[:length])
+        assert snapshot.load_snapshot(str(snapshot_path), sources) is None
+
+
+def test_failed_snapshot_write_warns(data_copy):
+    # The snapshot's directory does not exist, so it cannot be written
+    snapshot_path = data_copy / "missing" / "catalogue.snapshot"
+
+    repo = MemoryRepository()
+    with pytest.warns(RuntimeWarning, match="Could not write catalogue snapshot"):
+        repository_populate.populate(data_copy, repo, False, str(snapshot_path))
+    assert repo.get_number_of_podcasts() == 11
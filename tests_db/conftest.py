@@ -13,13 +13,14 @@ from podcast.adapters.orm import mapper_registry, map_model_to_tables
 test_data_path = Path(__file__).parent / '..' / 'tests'
 
 TEST_DATABASE_URI_IN_MEMORY = 'sqlite://'
-TEST_DATABASE_URI_FILE = 'sqlite:///podcasts-test.db'
+TEST_DATABASE_FILE = 'podcasts-test.db'
 
 
 @pytest.fixture
-def database_engine():
+def database_engine(tmp_path):
     clear_mappers()
-    engine = create_engine(TEST_DATABASE_URI_FILE)
+    # A file database in pytest's temporary directory, so no database is left in the working tree
+    engine = create_engine(f'sqlite:///{tmp_path / TEST_DATABASE_FILE}')
     mapper_registry.metadata.create_all(engine)  # Conditionally create database tables.
     with engine.connect() as connection:
         for table in reversed(mapper_registry.metadata.sorted_tables):  # Remove any data from the tables.
@@ -33,6 +34,7 @@ def database_engine():
     repository_populate.populate(test_data_path, repo_instance, database_mode)
     yield engine
     mapper_registry.metadata.drop_all(engine)
+    engine.dispose()
 
 
 # Fixture Incomplete/untested
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.pool import NullPool, QueuePool
+
+from podcast.adapters.database_engine import create_database_engine
+
+
+def read_pragma(engine, name):
+    with engine.connect() as connection:
+        return connection.execute(text(f'PRAGMA {name}')).scalar()
+
+
+def test_performance_profile_applies_pragmas(tmp_path):
+    engine = create_database_engine(f'sqlite:///{tmp_path / "perf.db"}', profile='performance',
+                                    cache_size_kib=2048, mmap_size=1024 * 1024)
+
+    assert isinstance(engine.pool, QueuePool)
+    assert read_pragma(engine, 'journal_mode') == 'wal'
+    assert read_pragma(engine, 'synchronous') == 1  # NORMAL
+    assert read_pragma(engine, 'cache_size') == -2048
+    assert read_pragma(engine, 'mmap_size') == 1024 * 1024
+    assert read_pragma(engine, 'temp_store') == 2  # MEMORY
+    engine.dispose()
+
+
+def test_performance_pool_overflow_is_bounded(tmp_path):
+    engine = create_database_engine(f'sqlite:///{tmp_path / "pool.db"}', pool_size=1, max_overflow=1,
+                                    pool_timeout=0.1)
+
+    # One pooled connection plus one overflow, then checkouts time out instead of opening more
+    first, second = engine.connect(), engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    first.close()
+    second.close()
+    engine.dispose()
+
+
+def test_default_profile_keeps_sqlite_defaults(tmp_path):
+    engine = create_database_engine(f'sqlite:///{tmp_path / "default.db"}', profile='default')
+
+    assert isinstance(engine.pool, NullPool)
+    assert read_pragma(engine, 'journal_mode') == 'delete'
+    assert read_pragma(engine, 'synchronous') == 2  # FULL
+    engine.dispose()
+
+
+def test_unknown_profile_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        create_database_engine(f'sqlite:///{tmp_path / "unknown.db"}', profile='turbo')
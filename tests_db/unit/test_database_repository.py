@@ -1,8 +1,21 @@
+import threading
+from contextlib import contextmanager
+
 import pytest
+from flask import Flask
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from podcast.adapters.database_engine import create_database_engine
+from podcast.adapters.orm import mapper_registry, map_model_to_tables
 
 from podcast.domainmodel.model import Author, Podcast, Category, User, Episode, Review, Playlist
+from podcast.adapters import database_repository
 from podcast.adapters.database_repository import SqlAlchemyRepository
+from podcast.adapters.memory_repository import MemoryRepository
 
+from podcast import register_session_hooks
+from podcast.playlist import services as playlist_services
 from tests_db.conftest import session_factory
 
 
@@ -266,7 +279,7 @@ def test_add_and_fetch_playlist(session_factory):
     assert fetched_playlist == playlist
 
 
-def test_update_users_playlist(session_factory):
+def test_add_episodes_to_users_playlist(session_factory):
     repo = SqlAlchemyRepository(session_factory)
 
     # Create user and playlist
@@ -283,16 +296,14 @@ def test_update_users_playlist(session_factory):
     assert users_playlist.list_of_episodes == []
 
     # Add episode from podcast 1
-    episodes = repo.get_episodes_for_podcast(1)
-    playlist.add_episode(episodes[1])
-
-    # Update playlist
-    repo.update_users_playlist(playlist)
+    episode = repo.get_episodes_for_podcast(1)[1]
+    episode_id = episode.id
+    assert repo.add_episodes_to_playlist(users_playlist, [episode]) == 1
 
-    # Check that playlist has added episode
-    assert playlist.list_of_episodes == [episodes[1]]
-    # Check that playlist go updated in repo
-    assert users_playlist._episodes == [episodes[1]]
+    # Check that playlist got updated in repo
+    repo.reset_session()
+    users_playlist = repo.get_playlist_by_user(repo.get_user("testuser"))
+    assert [episode.id for episode in users_playlist.list_of_episodes] == [episode_id]
 
 
 def test_get_podcasts_sorted_alphabetically(session_factory):
@@ -324,14 +335,13 @@ def test_search_podcast_by_author(session_factory):
     repo = SqlAlchemyRepository(session_factory)
 
     # get list that is filter by the specific search
-    filtered_list = repo.search_podcast_by_author("Audioboom")
+    filtered_list = repo.search_podcasts("Audioboom", "author").results
     assert len(filtered_list) == 2  # Checking its correct length (2 Audioboom podcast)
     # Checking it is the correct podcast:
-    assert filtered_list[0].title == "Crawlspace: True Crime & Mysteries"
-    assert filtered_list[1].title == "AHDB"
+    assert {podcast.title for podcast in filtered_list} == {"Crawlspace: True Crime & Mysteries", "AHDB"}
 
     # Checking if there is nothing searched, it will just return an empty list
-    nothing_list = repo.search_podcast_by_author("NotExist")
+    nothing_list = repo.search_podcasts("NotExist", "author").results
     assert nothing_list == []
 
 
@@ -339,15 +349,14 @@ def test_search_podcast_by_title(session_factory):
     repo = SqlAlchemyRepository(session_factory)
 
     # get list that is filter by the specific search
-    filtered_list = repo.search_podcast_by_title("radio")
+    filtered_list = repo.search_podcasts("radio", "title").results
     assert len(filtered_list) == 3  # 3 podcast that has radio in its title
     # Checking that it is the correct podcasts
-    assert filtered_list[0].title == "D-Hour Radio Network"
-    assert filtered_list[1].title == "Brian Denny Radio"
-    assert filtered_list[2].title == "Onde Road - Radio Popolare"
+    assert {podcast.title for podcast in filtered_list} == {"D-Hour Radio Network", "Brian Denny Radio",
+                                                            "Onde Road - Radio Popolare"}
 
     # Checking if there is nothing searched, it will just return an empty list
-    nothing_list = repo.search_podcast_by_author("NotExist")
+    nothing_list = repo.search_podcasts("NotExist", "author").results
     assert nothing_list == []
 
 
@@ -355,7 +364,7 @@ def test_search_podcast_by_category(session_factory):
     repo = SqlAlchemyRepository(session_factory)
 
     # get list that is filter by the specific search
-    filtered_list = repo.search_podcast_by_category("Comedy")
+    filtered_list = repo.search_podcasts("Comedy", "category").results
     assert len(filtered_list) == 2  # 2 podcast has Comedy in its categories from test files
 
     # Checking that these podcast have Comedy category in them
@@ -365,7 +374,7 @@ def test_search_podcast_by_category(session_factory):
     assert comedy_category in filtered_list[1].categories
 
     # Checking if there is nothing searched, it will just return an empty list
-    nothing_list = repo.search_podcast_by_author("NotExist")
+    nothing_list = repo.search_podcasts("NotExist", "author").results
     assert nothing_list == []
 
 
@@ -373,7 +382,7 @@ def test_search_podcast_by_language(session_factory):
     repo = SqlAlchemyRepository(session_factory)
 
     # get list that is filter by the specific search
-    filtered_list = repo.search_podcast_by_language("Italian")
+    filtered_list = repo.search_podcasts("Italian", "language").results
     assert len(filtered_list) == 1  # Only 1 Italian podcast
 
     # Checking it is the right podcast
@@ -381,5 +390,475 @@ def test_search_podcast_by_language(session_factory):
     assert filtered_list[0].language == "Italian"
 
     # Checking if there is nothing searched, it will just return an empty list
-    nothing_list = repo.search_podcast_by_author("NotExist")
-    assert nothing_list == []
\ No newline at end of file
+    nothing_list = repo.search_podcasts("NotExist", "author").results
+    assert nothing_list == []
+
+
+@contextmanager
+def record_statements(session_factory):
+    # Collects (statement, executemany) for every statement sent to the database inside the with block
+    statements = []
+    engine = session_factory.kw['bind']
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, executemany))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def test_add_multiple_episodes_inserts_in_batches(session_factory):
+    repo = SqlAlchemyRepository(session_factory, batch_size=2)
+    with record_statements(session_factory) as statements:
+        episodes = [Episode(episode_id=9000 + i, podcast_id=1, title=f"Bulk Episode {i}") for i in range(5)]
+        repo.add_multiple_episodes(episodes)
+
+        # 5 episodes with a batch size of 2 is 3 executemany inserts, plus 3 into the search table, and no SELECT at all
+        inserts = [statement for statement, executemany in statements if statement.startswith('INSERT')]
+        assert len([statement for statement in inserts if 'INTO episodes ' in statement]) == 3
+        assert len([statement for statement in inserts if 'INTO episodes_fts ' in statement]) == 3
+        assert not any(statement.startswith('SELECT') for statement, executemany in statements)
+        assert repo.get_number_of_episodes() == 25
+
+
+def test_add_multiple_authors_does_not_select_per_author(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    with record_statements(session_factory) as statements:
+        # 'Audioboom' already exists and is skipped
+        authors = [Author(author_id=100 + i, name=f"Bulk Author {i}") for i in range(10)]
+        authors.append(Author(author_id=200, name="Audioboom"))
+        repo.add_multiple_authors(authors)
+
+        selects = [statement for statement, executemany in statements if statement.startswith('SELECT')]
+        assert len(selects) == 1
+        assert repo.get_number_of_authors() == 19
+
+
+def test_add_multiple_podcasts_inserts_category_associations(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    author = repo.get_authors()[0]
+    comedy = repo.get_category("Comedy")
+
+    podcast = Podcast(podcast_id=5000, title="Bulk Podcast", author=author)
+    podcast.add_category(comedy)
+    repo.add_multiple_podcasts([podcast])
+
+    assert repo.get_podcast(5000).title == "Bulk Podcast"
+    assert repo.search_podcasts("Comedy", "category").total == 3
+
+
+def test_get_podcast_loads_description_page_data_up_front(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    with record_statements(session_factory) as statements:
+        podcast = repo.get_podcast(100)
+        number_of_queries = len(statements)
+
+        # Reading the author, categories and reviews afterwards does not go back to the database
+        assert podcast.author.name is not None
+        assert len(podcast.categories) > 0
+        assert podcast.reviews == []
+        assert len(statements) == number_of_queries
+        # The podcast row itself is fetched by primary key, never by scanning the podcasts table
+        assert all('ORDER BY podcasts.podcast_id' not in statement for statement, executemany in statements)
+
+
+def test_get_episodes_for_podcast_is_ordered_by_date(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    # Added out of date order, and the first one has no date at all
+    repo.add_multiple_episodes([
+        Episode(9001, 2, "Newest", pub_date="2030-01-02 00:00:00+00"),
+        Episode(9002, 2, "Undated"),
+        Episode(9003, 2, "Oldest", pub_date="2001-01-01 00:00:00+00"),
+    ])
+
+    episodes = repo.get_episodes_for_podcast(2)
+    timestamps = [episode.pub_timestamp for episode in episodes]
+    assert timestamps == sorted(timestamps)
+    assert episodes[0].title == "Undated"
+    assert episodes[1].title == "Oldest"
+    assert episodes[-1].title == "Newest"
+
+
+def test_get_user_by_id(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = User(7, 'Dave', '123456789')
+    repo.add_user(user)
+
+    assert repo.get_user_by_id(7) is user
+    assert repo.get_user_by_id(8) is None
+
+
+def test_get_rating_summary(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = User(1, 'Dave', '123456789')
+    repo.add_user(user)
+    assert repo.get_rating_summary(1) == (0, 0)
+
+    repo.add_review(Review(1, user, repo.get_podcast(1), 5, "Amazing podcast!"))
+    repo.add_review(Review(2, user, repo.get_podcast(1), 2, "Not for me"))
+    repo.add_review(Review(3, user, repo.get_podcast(2), 1, "Another podcast"))
+    with record_statements(session_factory) as statements:
+        # Counted and averaged in SQL, in a single query
+        assert repo.get_rating_summary(1) == (2, 3.5)
+        assert len(statements) == 1 and 'avg(' in statements[0][0].lower()
+
+
+def test_create_review_uses_autoincrement_ids_under_concurrency(tmp_path):
+    # A file database, so every thread's connection sees the same data
+    clear_mappers()
+    engine = create_database_engine(f'sqlite:///{tmp_path / "reviews.db"}')
+    mapper_registry.metadata.create_all(engine)
+    map_model_to_tables()
+    repo = SqlAlchemyRepository(sessionmaker(autocommit=False, autoflush=True, bind=engine))
+    author = Author(1, "Author")
+    repo.add_author(author)
+    repo.add_podcast(Podcast(1, author, "Podcast"))
+    repo.add_user(User(1, 'Dave', '123456789'))
+
+    created = []
+
+    def post_reviews():
+        user = repo.get_user('Dave')
+        podcast = repo.get_podcast(1)
+        for _ in range(25):
+            review = repo.create_review(user, podcast, 4, "Great podcast!")
+            created.append((review.id, review.podcast.id))
+
+    threads = [threading.Thread(target=post_reviews) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Every post got a distinct id and the review comes back attached to its podcast
+    assert sorted(created) == [(review_id, 1) for review_id in range(1, 101)]
+    assert sorted(review.id for review in repo.get_reviews()) == list(range(1, 101))
+    assert repo.get_rating_summary(1) == (100, 4)
+    engine.dispose()
+
+
+def test_search_podcasts_uses_full_text_index(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    with record_statements(session_factory) as statements:
+        # 3 podcasts in the test csv have a title word starting with 'radio'
+        results = repo.search_podcasts("radio", "title").results
+        assert {podcast.title for podcast in results} == {"D-Hour Radio Network", "Brian Denny Radio",
+                                                          "Onde Road - Radio Popolare"}
+        assert any('MATCH' in statement for statement, executemany in statements)
+
+        # Word prefixes, every word required, any field when no field is given
+        assert [podcast.title for podcast in repo.search_podcasts("ital", "language").results] == [
+            "Onde Road - Radio Popolare"]
+        assert [podcast.title for podcast in repo.search_podcasts("onde popol").results] == [
+            "Onde Road - Radio Popolare"]
+        assert repo.search_podcasts("radio zzzz") == ([], 0)
+        # Words shorter than MIN_PREFIX_LENGTH only match whole words
+        assert [podcast.title for podcast in repo.search_podcasts("d", "title").results] == ["D-Hour Radio Network"]
+        assert repo.search_podcasts("ra", "title") == ([], 0)
+        # Nothing to search for, an unknown field, or FTS5 syntax in the query
+        assert repo.search_podcasts("", "title") == ([], 0)
+        assert repo.search_podcasts("radio", "unknown") == ([], 0)
+        assert repo.search_podcasts('radio" *').total == repo.search_podcasts("radio").total
+
+
+def test_search_podcasts_ranks_title_matches_first_and_sees_new_podcasts(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    author = Author(5000, "Comedy Central")
+    repo.add_author(author)
+    repo.add_podcast(Podcast(5000, author, "Comedy Comedy Hour"))
+
+    results = repo.search_podcasts("comedy").results
+    # The new podcast matches in its title as well as its author, so it ranks above category matches
+    assert results[0].id == 5000
+    assert len(results) == 3
+
+
+def test_search_episodes_pages_through_full_text_index(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    # The 3 Locked On Cubs episodes, each page fetched separately
+    first_page = repo.search_episodes("cubs", 0, 2)
+    second_page = repo.search_episodes("cubs", 2, 2)
+    assert first_page.total == second_page.total == 3
+    assert len(first_page.results) == 2
+    assert {episode.id for episode in first_page.results + second_page.results} == {4399, 4400, 4401}
+    assert [episode.id for episode in repo.search_episodes("cubs").results] == \
+           [episode.id for episode in first_page.results + second_page.results]
+
+    # Every word must match, and markup in the descriptions is not searched
+    assert {episode.id for episode in repo.search_episodes("cubs episode").results} == {4400, 4401}
+    assert repo.search_episodes("feedflare") == ([], 0)
+    assert repo.search_episodes("") == ([], 0)
+
+    # Added episodes are searchable straight away
+    repo.add_episode(Episode(9999, 1, "Cubs Bonus"))
+    assert repo.search_episodes("cubs bonus").results[0].id == 9999
+
+
+def test_search_podcasts_pages_in_sql(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    everything = repo.search_podcasts("a", order='title')
+    assert everything.total == len(everything.results) > 4
+
+    with record_statements(session_factory) as statements:
+        page = repo.search_podcasts("a", offset=2, limit=2, order='title')
+
+        # A COUNT for the total, then only the two podcasts on the page are loaded
+        assert page.total == everything.total
+        assert page.results == everything.results[2:4]
+        assert any('count(*)' in statement for statement, executemany in statements)
+        assert any('LIMIT' in statement for statement, executemany in statements)
+
+        # Titles starting with a letter come first, alphabetically ignoring case
+        titles = [podcast.title for podcast in everything.results]
+        assert titles == sorted(titles, key=lambda title: (not title[:1].isalpha(), title.lower()))
+
+        with pytest.raises(ValueError):
+            repo.search_podcasts("a", order='unknown')
+
+
+def test_search_title_order_matches_memory_for_non_ascii_titles(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    in_memory_repo = MemoryRepository()
+    author = repo.get_podcast(1).author
+    titles = ["Zebra Soak", "Éclair Soak", "élan Soak", "Ábaco Soak", "9 Soak", "apple Soak"]
+    for i, title in enumerate(titles):
+        podcast = Podcast(6000 + i, author, title)
+        repo.add_podcast(podcast)
+        in_memory_repo.add_podcast(podcast)
+        repo.add_episode(Episode(9000 + i, 6000 + i, title))
+        in_memory_repo.add_episode(Episode(9000 + i, 6000 + i, title))
+
+    # Both repositories order by the same stored title_sort_key, accented capitals included
+    for search in ('search_podcasts', 'search_episodes'):
+        in_database = [result.id for result in getattr(repo, search)("soak", order='title').results]
+        in_memory = [result.id for result in getattr(in_memory_repo, search)("soak", order='title').results]
+        assert in_database == in_memory
+
+
+def test_get_catalogue_page(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    every_podcast = repo.get_podcasts_by_alphabet([])
+
+    # Pages of the same alphabetical order, fetched with LIMIT and OFFSET
+    assert repo.get_catalogue_page(0, 100) == every_podcast
+    assert repo.get_catalogue_page(3, 4) == every_podcast[3:7]
+    assert repo.get_catalogue_page(100, 4) == []
+
+
+def test_get_catalogue_page_uses_keyset_and_cached_page_count(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    every_podcast = repo.get_podcasts_by_alphabet([])
+    assert repo.get_catalogue_page_count(4) == 3
+
+    # Later pages read the key of the podcast before them, then start after it; the count is not run again and
+    # the only other statement loads the page's categories
+    with record_statements(session_factory) as statements:
+        assert repo.get_catalogue_page(8, 4) == every_podcast[8:]
+        assert repo.get_catalogue_page_count(4) == 3
+        assert len(statements) == 3
+        assert 'LIMIT ? OFFSET ?' in statements[0][0] and 'podcasts.title' not in statements[0][0]
+        assert '(podcasts.sort_key, podcasts.podcast_id) >' in statements[1][0]
+        assert not any('count(' in statement for statement, executemany in statements)
+
+        # Adding a podcast drops the cached count, and it appears in its place
+        author = Author(5000, "New Author")
+        repo.add_author(author)
+        repo.add_podcast(Podcast(5000, author, "aaa First"))
+        assert repo.get_catalogue_page_count(4) == 3
+        assert repo.get_catalogue_page(0, 1)[0].id == 5000
+        assert repo.get_catalogue_page(9, 4) == every_podcast[8:]
+        assert repo.get_catalogue_page(12, 4) == []
+
+
+def test_catalogue_sees_podcasts_added_by_another_writer(session_factory, monkeypatch):
+    repo = SqlAlchemyRepository(session_factory)
+    other_writer = SqlAlchemyRepository(session_factory)
+    assert repo.get_catalogue_page_count(4) == 3
+
+    author = Author(5000, "New Author")
+    other_writer.add_author(author)
+    other_writer.add_podcast(Podcast(5000, author, "aaa First"))
+
+    # Pages are read from the database every time, so the new podcast is in place straight away
+    repo.reset_session()
+    assert repo.get_catalogue_page(0, 1)[0].id == 5000
+    # The cached count catches up once it expires
+    assert repo.get_catalogue_page_count(1) == 11
+    monkeypatch.setattr(database_repository, 'CATALOGUE_COUNT_TTL', 0)
+    assert repo.get_catalogue_page_count(1) == 12
+
+
+def test_playlist_episodes_reload_in_the_order_added(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = User(user_id=1, username="testuser", password="password")
+    repo.add_user(user)
+    playlist = Playlist(1, user, "My Playlist")
+    repo.add_playlist(playlist)
+
+    # Added newest first, which is neither id nor date order
+    playlist = repo.get_playlist_by_user(user)
+    repo.add_episodes_to_playlist(playlist, reversed(repo.get_episodes_for_podcast(1)))
+
+    repo.reset_session()
+    reloaded = repo.get_playlist_by_user(repo.get_user("testuser"))
+    assert [episode.id for episode in reloaded.list_of_episodes] == [4954, 4922, 4885]
+    assert repo.get_episode(4922) in reloaded
+
+
+def test_toggling_a_playlist_episode_is_one_statement(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = User(user_id=1, username="testuser", password="password")
+    repo.add_user(user)
+    repo.add_playlist(Playlist(1, user, "My Playlist"))
+    playlist = repo.get_playlist_by_user(user)
+    repo.add_episodes_to_playlist(playlist, repo.get_episodes())
+    episode = repo.get_episode(4922)
+
+    # Removing and adding back one episode each send a single statement, whatever the size of the playlist
+    with record_statements(session_factory) as statements:
+        assert repo.remove_episodes_from_playlist(playlist, [episode]) == 1
+        assert len(statements) == 1 and statements[0][0].startswith('DELETE')
+        assert episode not in playlist
+        del statements[:]
+        assert repo.add_episodes_to_playlist(playlist, [episode]) == 1
+        assert len(statements) == 1 and statements[0][0].startswith('INSERT')
+
+        # Adding an episode that is already there writes nothing
+        assert repo.add_episodes_to_playlist(playlist, [episode]) == 0
+        assert len(playlist.list_of_episodes) == 20
+        assert playlist.list_of_episodes[-1] == episode
+
+
+def test_removing_an_unknown_episode_leaves_the_playlist(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = User(user_id=1, username="testuser", password="password")
+    repo.add_user(user)
+    repo.add_playlist(Playlist(1, user, "My Playlist"))
+    playlist = repo.get_playlist_by_user(user)
+    repo.add_episodes_to_playlist(playlist, [repo.get_episode(4922)])
+
+    # No episode has id 5, so there is no episode to remove
+    playlist_services.remove_episode_from_playlist(playlist, playlist_services.get_episode_by_id(5, repo), repo)
+    assert [episode.id for episode in repo.get_playlist_by_user(user).list_of_episodes] == [4922]
+
+
+def test_playlist_podcast_episodes_are_added_with_insert_select(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = User(user_id=1, username="testuser", password="password")
+    repo.add_user(user)
+    repo.add_playlist(Playlist(1, user, "My Playlist"))
+    playlist = repo.get_playlist_by_user(user)
+    repo.add_episodes_to_playlist(playlist, [repo.get_episode(4922)])
+
+    # Podcast 1's other two episodes go in with one statement, oldest first
+    with record_statements(session_factory) as statements:
+        assert repo.add_podcast_episodes_to_playlist(playlist, 1) == 2
+        assert len(statements) == 1 and 'INSERT INTO playlist_episodes' in statements[0][0]
+        assert [episode.id for episode in playlist.list_of_episodes] == [4922, 4885, 4954]
+
+        assert repo.remove_podcast_episodes_from_playlist(playlist, 1) == 3
+        assert repo.remove_podcast_episodes_from_playlist(playlist, 1) == 0
+        assert playlist.list_of_episodes == []
+
+
+def test_get_playlist_page(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = User(user_id=1, username="testuser", password="password")
+    repo.add_user(user)
+    repo.add_playlist(Playlist(1, user, "My Playlist"))
+    playlist = repo.get_playlist_by_user(user)
+    repo.add_episodes_to_playlist(playlist, [repo.get_episode(4954), repo.get_episode(4399)])
+    repo.add_episodes_to_playlist(playlist, repo.get_episodes())
+    repo.reset_session()
+    playlist = repo.get_playlist_by_user(repo.get_user("testuser"))
+
+    # The page, with each episode's podcast, is one SELECT and the total one more; the rest of the playlist and
+    # the podcasts themselves are never loaded
+    with record_statements(session_factory) as statements:
+        entries, total = repo.get_playlist_page(playlist, 0, 9)
+        assert len(statements) == 2
+        assert total == 20
+        assert [entry.episode.id for entry in entries[:2]] == [4954, 4399]
+        assert entries[0].podcast_id == 1
+        assert entries[0].podcast_title == "D-Hour Radio Network"
+        assert entries[0].podcast_image == repo.get_podcast(1).image
+
+        entries, total = repo.get_playlist_page(playlist, 18, 9)
+        assert len(entries) == 2 and total == 20
+
+
+def render_podcast_cards(podcasts):
+    # What the catalogue, home and search pages read from each podcast
+    return [(podcast.author.name, [category.name for category in podcast.categories]) for podcast in podcasts]
+
+
+@pytest.mark.parametrize('page_size', [1, 4, 10])
+def test_pages_use_a_fixed_number_of_queries(session_factory, page_size):
+    repo = SqlAlchemyRepository(session_factory)
+    user = User(user_id=1, username="testuser", password="password")
+    repo.add_user(user)
+    for rating in range(1, page_size + 1):
+        repo.create_review(user, repo.get_podcast(1), rating, "Review")
+    repo.get_catalogue_page_count(page_size)
+
+    def catalogue_page():
+        render_podcast_cards(repo.get_catalogue_page(1, page_size))
+
+    def search_page():
+        [podcast.author.name for podcast in repo.search_podcasts("radio", offset=0, limit=page_size).results]
+
+    def description_page():
+        podcast = repo.get_podcast(1)
+        render_podcast_cards([podcast])
+        [review.reviewer.username for review in podcast.reviews]
+
+    # However many podcasts or reviews are on the page, their authors, categories and reviewers come with them
+    with record_statements(session_factory) as statements:
+        for action, expected in ((catalogue_page, 3), (lambda: render_podcast_cards(repo.get_random_podcasts()), 2),
+                                 (lambda: render_podcast_cards(repo.get_podcasts_by_alphabet([])), 2),
+                                 (search_page, 3), (description_page, 3)):
+            repo.reset_session()
+            del statements[:]
+            action()
+            assert len(statements) == expected, [statement for statement, executemany in statements]
+
+
+def test_each_request_gets_its_own_session(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    app = Flask(__name__)
+    register_session_hooks(app, repo)
+    loaded = []
+
+    @app.route('/podcast')
+    def show_podcast():
+        loaded.append(repo.get_podcast(1))
+        return loaded[-1].title
+
+    client = app.test_client()
+    assert client.get('/podcast').data == b"D-Hour Radio Network"
+    assert client.get('/podcast').data == b"D-Hour Radio Network"
+
+    # The session is closed when each request ends, so nothing loaded is kept or shared between requests
+    assert loaded[0] is not loaded[1]
+    assert inspect(loaded[0]).detached and inspect(loaded[1]).detached
+
+
+def test_identity_map_is_only_emptied_between_requests(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    repo.open_request_session()
+    podcast = next(podcast for podcast in repo.get_podcasts() if podcast.id == 1)
+
+    # However much more the request loads, objects it already holds can still lazy load their relationships
+    repo.get_episodes()
+    repo.get_catalogue_page(0, 20)
+    repo.get_podcast(2)
+    assert podcast.author.name == "D Hour Radio Network"
+    assert [episode.id for episode in podcast.Podcast_episodes] != []
+
+    # Closing the request is what lets go of them
+    repo.close_request_session()
+    assert inspect(podcast).detached
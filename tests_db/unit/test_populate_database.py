@@ -11,10 +11,22 @@ def test_database_populate_inspect_table_names(database_engine):
     assert inspector.get_table_names() == ['authors',
                                            'categories',
                                            'episodes',
+                                           'episodes_fts',  # full-text search table and its shadow tables
+                                           'episodes_fts_config',
+                                           'episodes_fts_content',
+                                           'episodes_fts_data',
+                                           'episodes_fts_docsize',
+                                           'episodes_fts_idx',
                                            'playlist_episodes',
                                            'playlists',
                                            'podcast_categories',
                                            'podcasts',
+                                           'podcasts_fts',  # full-text search table and its shadow tables
+                                           'podcasts_fts_config',
+                                           'podcasts_fts_content',
+                                           'podcasts_fts_data',
+                                           'podcasts_fts_docsize',
+                                           'podcasts_fts_idx',
                                            'reviews',
                                            'users']
     # Checked that we have all the tables made
@@ -127,7 +139,7 @@ def test_database_populate_select_all_episodes(database_engine):
 def test_database_populate_select_all_podcasts(database_engine):
     # Get table information
     inspector = inspect(database_engine)
-    name_of_podcasts_table = inspector.get_table_names()[6]
+    name_of_podcasts_table = inspector.get_table_names()[12]
 
     with database_engine.connect() as connection:
         # query for records in table podcasts
@@ -157,7 +169,7 @@ def test_database_populate_select_all_podcasts(database_engine):
 def test_database_populate_select_all_podcast_categories_association(database_engine):
     # Get table information
     inspector = inspect(database_engine)
-    name_of_podcast_categories_association_table = inspector.get_table_names()[5]
+    name_of_podcast_categories_association_table = inspector.get_table_names()[11]
 
     with database_engine.connect() as connection:
         # query for records in table podcast_categories_association
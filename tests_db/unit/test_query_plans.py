@@ -0,0 +1,196 @@
+import re
+
+from sqlalchemy import event, inspect, text
+
+from podcast.adapters.database_repository import SqlAlchemyRepository
+from podcast.adapters.orm import mapper_registry, upgrade_schema
+from podcast.domainmodel.model import User, Review, Playlist
+from tests_db.conftest import session_factory
+
+
+def query_plans(session_factory, action):
+    # Runs action() and returns the EXPLAIN QUERY PLAN lines of every SELECT it sent to the database
+    engine = session_factory.kw['bind']
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        action()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    plans = []
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+            plans.append([row[-1] for row in rows])
+    return plans
+
+
+def assert_searches_with_index(plans, table):
+    # The table must be looked up through an index (SEARCH) and never fully scanned (SCAN)
+    lines = [line for plan in plans for line in plan]
+    assert any(re.match(rf'SEARCH {table}(_\d+)?\b', line) for line in lines), lines
+    assert not any(re.match(rf'SCAN {table}(_\d+)?\b', line) for line in lines), lines
+
+
+def test_get_episodes_for_podcast_uses_index(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    plans = query_plans(session_factory, lambda: repo.get_episodes_for_podcast(1))
+    assert_searches_with_index(plans, 'episodes')
+
+
+def test_get_reviews_for_podcast_uses_index(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = User(1, "reviewer", "password")
+    repo.add_user(user)
+    repo.add_review(Review(1, user, repo.get_podcast(1), 4, "Nice"))
+
+    plans = query_plans(session_factory, lambda: repo.get_reviews_for_podcast(1))
+    assert_searches_with_index(plans, 'reviews')
+
+
+def test_get_playlist_by_user_uses_index(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = User(1, "listener", "password")
+    repo.add_user(user)
+    repo.add_playlist(Playlist(1, user, "Mine"))
+
+    plans = query_plans(session_factory, lambda: repo.get_playlist_by_user(user))
+    assert_searches_with_index(plans, 'playlists')
+
+
+def test_playlist_episodes_load_uses_index(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = User(1, "listener", "password")
+    repo.add_user(user)
+    playlist = Playlist(1, user, "Mine")
+    playlist.add_episode(repo.get_episode(4885))
+    repo.add_playlist(playlist)
+
+    # Lazy loading the episodes goes through playlist_episodes.playlist_id
+    repo.reset_session()
+    playlist = repo.get_playlist_by_user(repo.get_user("listener"))
+    plans = query_plans(session_factory, lambda: playlist.list_of_episodes)
+    assert_searches_with_index(plans, 'playlist_episodes')
+
+
+def test_get_playlist_page_uses_indexes(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = User(1, "listener", "password")
+    repo.add_user(user)
+    repo.add_playlist(Playlist(1, user, "Mine"))
+    playlist = repo.get_playlist_by_user(user)
+    repo.add_episodes_to_playlist(playlist, repo.get_episodes())
+
+    # The page is read in order through playlist_episodes.playlist_id, each episode and podcast by its key
+    plans = query_plans(session_factory, lambda: repo.get_playlist_page(playlist, 9, 9))
+    for table in ('playlist_episodes', 'episodes', 'podcasts'):
+        assert_searches_with_index(plans, table)
+    lines = [line for plan in plans for line in plan]
+    assert not any('TEMP B-TREE' in line for line in lines), lines
+
+
+def test_podcast_categories_load_uses_index(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    # get_podcast loads the categories through podcast_categories.podcast_id
+    plans = query_plans(session_factory, lambda: repo.get_podcast(1))
+    assert_searches_with_index(plans, 'podcast_categories')
+
+
+def episode_index_names(engine):
+    return [index['name'] for index in inspect(engine).get_indexes('episodes')]
+
+
+def test_upgrade_schema_adds_missing_indexes(session_factory):
+    engine = session_factory.kw['bind']
+    with engine.begin() as connection:
+        connection.execute(text('DROP INDEX ix_episodes_podcast_id_pub_timestamp'))
+    assert 'ix_episodes_podcast_id_pub_timestamp' not in episode_index_names(engine)
+
+    upgrade_schema(engine)
+
+    assert 'ix_episodes_podcast_id_pub_timestamp' in episode_index_names(engine)
+    # Running it again on an up-to-date database is a no-op
+    upgrade_schema(engine)
+    expected = {index.name for table in mapper_registry.metadata.sorted_tables for index in table.indexes}
+    actual = {index['name'] for table in inspect(engine).get_table_names() for index in inspect(engine).get_indexes(table)}
+    assert expected <= actual
+
+
+def test_upgrade_schema_adds_and_backfills_pub_timestamp(session_factory):
+    engine = session_factory.kw['bind']
+    # Recreate the episodes table as it was before the pub_timestamp column existed
+    with engine.begin() as connection:
+        connection.execute(text('DROP INDEX ix_episodes_podcast_id_pub_timestamp'))
+        connection.execute(text('ALTER TABLE episodes DROP COLUMN pub_timestamp'))
+    assert 'pub_timestamp' not in [column['name'] for column in inspect(engine).get_columns('episodes')]
+
+    upgrade_schema(engine)
+
+    with engine.connect() as connection:
+        rows = dict(connection.execute(text('SELECT episode_id, pub_timestamp FROM episodes')).all())
+    assert len(rows) == 20
+    # Episode 4885 was published at 2017-12-02 02:00:00+00
+    assert rows[4885] == 1512180000
+
+    # The episodes come back in date order through the new index
+    repo = SqlAlchemyRepository(session_factory)
+    plans = query_plans(session_factory, lambda: repo.get_episodes_for_podcast(1))
+    lines = [line for plan in plans for line in plan]
+    assert any('ix_episodes_podcast_id_pub_timestamp' in line for line in lines), lines
+    assert not any('TEMP B-TREE' in line for line in lines), lines
+
+
+def test_upgrade_schema_rebuilds_search_tables(session_factory):
+    engine = session_factory.kw['bind']
+    with engine.begin() as connection:
+        connection.execute(text('DROP TABLE podcasts_fts'))
+        connection.execute(text('DROP TABLE episodes_fts'))
+    assert 'podcasts_fts' not in inspect(engine).get_table_names()
+    assert 'episodes_fts' not in inspect(engine).get_table_names()
+
+    upgrade_schema(engine)
+
+    # The rebuilt table holds every podcast, categories included
+    repo = SqlAlchemyRepository(session_factory)
+    with engine.connect() as connection:
+        assert connection.execute(text('SELECT count(*) FROM podcasts_fts')).scalar() == len(repo.get_podcasts())
+    assert {podcast.id for podcast in repo.search_podcasts("comedy", "category").results} == \
+           {podcast.id for podcast in repo.get_podcasts()
+            if any(category.name.lower() == "comedy" for category in podcast.categories)}
+    assert {episode.id for episode in repo.search_episodes("cubs").results} == {4399, 4400, 4401}
+
+
+def test_catalogue_page_reads_sort_key_index(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    repo.get_catalogue_page_count(4)
+
+    # The page is read in order from the index, starting at the previous page's last key
+    plans = query_plans(session_factory, lambda: repo.get_catalogue_page(4, 4))
+    lines = [line for plan in plans for line in plan]
+    assert any(re.match(r'SEARCH podcasts USING INDEX ix_podcasts_sort_key_podcast_id', line) for line in lines), lines
+    assert not any('TEMP B-TREE' in line for line in lines), lines
+
+
+def test_upgrade_schema_adds_and_backfills_sort_key(session_factory):
+    engine = session_factory.kw['bind']
+    with engine.begin() as connection:
+        connection.execute(text('DROP INDEX ix_podcasts_sort_key_podcast_id'))
+        connection.execute(text('ALTER TABLE podcasts DROP COLUMN sort_key'))
+        connection.execute(text('DROP INDEX ix_episodes_sort_key_episode_id'))
+        connection.execute(text('ALTER TABLE episodes DROP COLUMN sort_key'))
+
+    upgrade_schema(engine)
+
+    with engine.connect() as connection:
+        rows = dict(connection.execute(text('SELECT podcast_id, sort_key FROM podcasts')).all())
+        episode_rows = dict(connection.execute(text('SELECT episode_id, sort_key FROM episodes')).all())
+    assert rows[1] == '0d-hour radio network'
+    assert len(episode_rows) == 20 and all(episode_rows.values())
+    repo = SqlAlchemyRepository(session_factory)
+    assert [podcast.sort_key for podcast in repo.get_catalogue_page(0, 20)] == sorted(rows.values())